@@ -0,0 +1,123 @@
+import json
+import threading
+import zlib
+from typing import Callable, Dict, List
+from smart_agent import AdaptiveRLAgent
+
+DEFAULT_SERVICE = 'global'  # Shard key for events that don't name a service
+
+def service_of(data) -> str:
+    """Shard key for an event payload: its 'service' if that is a non-empty string"""
+    service = data.get('service') if isinstance(data, dict) else None
+    return service if isinstance(service, str) and service else DEFAULT_SERVICE
+
+class ShardedAgentPool:
+    """One AdaptiveRLAgent per service, spread over lock-guarded shards
+
+    Services are hash-partitioned (crc32, so placement is stable across
+    processes) into num_shards shards; each shard's lock serializes the
+    updates of its agents while other shards proceed. Services keep
+    independent Q-tables; merged_agent() combines them for reporting.
+    """
+
+    def __init__(self, num_shards: int = 8, agent_factory: Callable[[], AdaptiveRLAgent] = AdaptiveRLAgent):
+        self.agent_factory = agent_factory
+        self._shards = [({}, threading.Lock()) for _ in range(num_shards)]
+
+    @property
+    def num_shards(self) -> int:
+        return len(self._shards)
+
+    def shard_of(self, service: str) -> int:
+        """Index of the shard holding service's agent"""
+        return zlib.crc32(service.encode()) % len(self._shards)
+
+    def _agent(self, agents: Dict, service: str) -> AdaptiveRLAgent:
+        """Agent for service within its shard (caller holds the shard lock)"""
+        agent = agents.get(service)
+        if agent is None:
+            agent = agents[service] = self.agent_factory()
+        return agent
+
+    def learn(self, service: str, state: Dict, reward: float) -> str:
+        """Choose an action for state in the service's agent and learn from reward; returns the action"""
+        return self.learn_batch([(service, state, reward)])[0]
+
+    def learn_batch(self, transitions: List[tuple]) -> List[str]:
+        """Apply (service, state, reward) transitions, taking each shard's lock once
+
+        Transitions for the same service are applied in order. Returns the
+        action chosen for each transition, in input order.
+        """
+        by_shard = {}
+        for position, (service, state, reward) in enumerate(transitions):
+            by_shard.setdefault(self.shard_of(service), []).append((position, service, state, reward))
+
+        actions = [None] * len(transitions)
+        for index, batch in by_shard.items():
+            agents, lock = self._shards[index]
+            with lock:
+                for position, service, state, reward in batch:
+                    agent = self._agent(agents, service)
+                    action = agent.get_action(state)
+                    agent.update_policy(state, action, reward)
+                    actions[position] = action
+        return actions
+
+    def update_policy(self, service: str, state: Dict, action: str, reward: float):
+        """Apply a known (state, action, reward), e.g. when replaying logged updates"""
+        agents, lock = self._shards[self.shard_of(service)]
+        with lock:
+            self._agent(agents, service).update_policy(state, action, reward)
+
+    def get_policy_drift(self, service: str) -> Dict:
+        agents, lock = self._shards[self.shard_of(service)]
+        with lock:
+            return self._agent(agents, service).get_policy_drift()
+
+    def q_tables(self) -> Dict[str, Dict]:
+        """Copy of every service's Q-table"""
+        tables = {}
+        for agents, lock in self._shards:
+            with lock:
+                for service, agent in agents.items():
+                    tables[service] = {state: dict(values) for state, values in agent.q_table.items()}
+        return tables
+
+    def merged_agent(self) -> AdaptiveRLAgent:
+        """Agent whose Q-values average every service that has visited each state
+
+        Policy history is the union of all services', in timestamp order.
+        Meant for reporting; learning continues in the per-service agents.
+        """
+        merged = self.agent_factory()
+        totals, counts, history = {}, {}, []
+        for agents, lock in self._shards:
+            with lock:
+                for agent in agents.values():
+                    history.extend(agent.policy_history)
+                    for state, values in agent.q_table.items():
+                        state_totals = totals.setdefault(state, dict.fromkeys(values, 0.0))
+                        for action, value in values.items():
+                            state_totals[action] = state_totals.get(action, 0.0) + value
+                        counts[state] = counts.get(state, 0) + 1
+
+        merged.q_table = {
+            state: {action: value / counts[state] for action, value in values.items()}
+            for state, values in totals.items()
+        }
+        merged.policy_history = sorted(history, key=lambda update: update['timestamp'])
+        return merged
+
+    def save_policy(self, filename: str):
+        """Save the merged policy in AdaptiveRLAgent's format, plus each service's Q-table"""
+        merged = self.merged_agent()
+        policy_data = {
+            'q_table': merged.q_table,
+            'policy_history': merged.policy_history,
+            'drift_metrics': merged.get_policy_drift(),
+            'services': self.q_tables()
+        }
+
+        with open(filename, 'w') as f:
+            json.dump(policy_data, f, indent=2)
@@ -0,0 +1,191 @@
+import asyncio
+import aiohttp
+from datetime import datetime
+from domain_registry import domain_registry
+from retry_policy import RetryPolicy
+
+def _is_connect_timeout(error):
+    """Whether a timeout hit while opening the connection rather than awaiting the response
+
+    aiohttp 3.10+ raises ConnectionTimeoutError; older releases raise a
+    ServerTimeoutError that names the connection in its message.
+    """
+    connection_timeout = getattr(aiohttp, 'ConnectionTimeoutError', None)
+    if connection_timeout is not None:
+        return isinstance(error, connection_timeout)
+    return isinstance(error, aiohttp.ServerTimeoutError) and str(error).startswith('Connection timeout')
+
+class AsyncProductionConnector:
+    """asyncio counterpart of ProductionConnector
+
+    Offers the same operations and result dicts, but as coroutines sharing
+    one aiohttp session, so a single event loop can fan out to many domains
+    without a thread per in-flight call. The session is bound to the loop
+    that first uses it; use one connector per event loop.
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, retry_policy=None, registry=None):
+        self.registry = registry or domain_registry
+        self.connect_timeout = 3.05
+        self.read_timeout = 10
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.limit = limit                     # Open connections overall
+        self.limit_per_host = limit_per_host   # Open connections per domain
+        self._session = None
+
+    @property
+    def domains(self):
+        """Connection settings per domain, read through the registry so runtime changes apply"""
+        return self.registry.connector_domains()
+
+    def _get_session(self):
+        """Shared client session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host),
+                timeout=aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=self.read_timeout)
+            )
+        return self._session
+
+    def _headers(self, domain):
+        return {
+            'Authorization': f"Bearer {self.domains[domain]['api_key']}",
+            'Content-Type': 'application/json'
+        }
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def read_app_state(self, domain):
+        """Read current application state from live domain"""
+        try:
+            config = self.domains[domain]
+            url = f"{config['base_url']}{config['endpoints']['status']}"
+
+            async with self._get_session().get(url, headers=self._headers(domain)) as response:
+                if response.status == 200:
+                    return {
+                        'status': 'success',
+                        'data': await response.json(),
+                        'timestamp': datetime.now().isoformat()
+                    }
+                else:
+                    return {
+                        'status': 'error',
+                        'error': f"HTTP {response.status}",
+                        'timestamp': datetime.now().isoformat()
+                    }
+
+        except asyncio.TimeoutError:
+            return {'status': 'timeout', 'error': 'Domain unresponsive'}
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+
+    async def execute_deploy_command(self, domain, deploy_data):
+        """Execute deployment command on live domain"""
+        return await self._execute_command(domain, 'deploy', deploy_data)
+
+    async def execute_restart_command(self, domain, service_name):
+        """Execute service restart on live domain"""
+        restart_data = {'service': service_name, 'action': 'restart'}
+        return await self._execute_command(domain, 'restart', restart_data)
+
+    async def _execute_command(self, domain, command_type, data):
+        """Generic command execution with retry logic; backoff waits don't block the loop"""
+        attempt = 0
+        while True:
+            result, outcome = await self._attempt_command(domain, command_type, data, attempt)
+            delay = self.retry_policy.next_delay(domain, command_type, outcome, attempt)
+            if delay is None:
+                result['attempts'] = attempt + 1
+                return result
+
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _attempt_command(self, domain, command_type, data, attempt):
+        """POST a command once; returns (result, outcome) for the retry policy"""
+        config = self.domains[domain]
+        url = f"{config['base_url']}{config['endpoints'][command_type]}"
+        result = {'domain': domain, 'command': command_type, 'attempt': attempt + 1}
+
+        try:
+            async with self._get_session().post(url, json=data, headers=self._headers(domain)) as response:
+                outcome = self.retry_policy.classify_status(response.status)
+                result.update({
+                    'status': 'success' if outcome == 'success' else 'failed',
+                    'response': await response.json() if outcome == 'success' else None,
+                    'http_code': response.status,
+                    'timestamp': datetime.now().isoformat()
+                })
+                return result, outcome
+
+        except asyncio.TimeoutError as e:
+            if _is_connect_timeout(e):
+                # Timed out opening the connection, so the domain never saw the request
+                result.update({'status': 'timeout', 'error': 'Domain unreachable'})
+                return result, 'connect_failed'
+            result.update({'status': 'timeout', 'error': 'Domain unresponsive'})
+            return result, 'timeout'
+
+        except aiohttp.ClientConnectorError as e:
+            # Connection could not be opened, so the domain never saw the request
+            result.update({'status': 'error', 'error': str(e)})
+            return result, 'connect_failed'
+
+        except aiohttp.ClientConnectionError as e:
+            result.update({'status': 'error', 'error': str(e)})
+            return result, 'connection_error'
+
+        except Exception as e:
+            result.update({'status': 'error', 'error': str(e)})
+            return result, 'error'
+
+    async def get_live_logs(self, domain, lines=100):
+        """Fetch recent logs from live domain"""
+        try:
+            config = self.domains[domain]
+            url = f"{config['base_url']}{config['endpoints']['logs']}?lines={lines}"
+
+            async with self._get_session().get(url, headers=self._headers(domain)) as response:
+                if response.status == 200:
+                    payload = await response.json()
+                    return {
+                        'status': 'success',
+                        'logs': payload.get('logs', []),
+                        'domain': domain,
+                        'timestamp': datetime.now().isoformat()
+                    }
+                else:
+                    return {'status': 'error', 'error': f"HTTP {response.status}"}
+
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+
+    async def fan_out(self, operation, domains, *args):
+        """Run one operation (e.g. 'read_app_state') against many domains concurrently
+
+        Returns a dict of domain -> result.
+        """
+        method = getattr(self, operation)
+        results = await asyncio.gather(*(method(domain, *args) for domain in domains))
+        return dict(zip(domains, results))
+
+if __name__ == "__main__":
+    async def main():
+        async with AsyncProductionConnector() as connector:
+            print("Testing both domains concurrently...")
+            states = await connector.fan_out('read_app_state', list(connector.domains))
+            for domain, state in states.items():
+                print(f"{domain} Status: {state}")
+
+    asyncio.run(main())
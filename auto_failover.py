@@ -1,7 +1,11 @@
 import time
+import random
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from enum import Enum
+from domain_registry import domain_registry
 
 class DomainStatus(Enum):
     HEALTHY = "HEALTHY"
@@ -9,32 +13,105 @@ class DomainStatus(Enum):
     DOWN = "DOWN"
     UNKNOWN = "UNKNOWN"
 
-class AutoFailover:
-    def __init__(self):
-        self.domains = {
-            'blackhole': {
-                'url': 'https://blackholeinfiverse.com/',
-                'priority': 1,
-                'status': DomainStatus.UNKNOWN,
-                'last_check': None,
-                'failure_count': 0,
-                'response_times': []
-            },
-            'uni_guru': {
-                'url': 'https://www.uni-guru.in/',
-                'priority': 2,
-                'status': DomainStatus.UNKNOWN,
-                'last_check': None,
-                'failure_count': 0,
-                'response_times': []
-            }
+class LatencyWindow:
+    """Fixed-size ring buffer of timestamped response times with percentile queries"""
+    
+    def __init__(self, size=120):
+        self.size = size
+        self._times = [0.0] * size
+        self._values = [0.0] * size
+        self._next = 0
+        self._count = 0
+    
+    def add(self, value, timestamp=None):
+        self._times[self._next] = time.time() if timestamp is None else timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+    
+    def __len__(self):
+        return self._count
+    
+    def values(self, window_seconds=None):
+        """Samples newest first, optionally only those from the last window_seconds"""
+        cutoff = time.time() - window_seconds if window_seconds else None
+        samples = []
+        for i in range(self._count):
+            index = (self._next - 1 - i) % self.size
+            if cutoff is not None and self._times[index] < cutoff:
+                break
+            samples.append(self._values[index])
+        return samples
+    
+    def percentiles(self, percentiles=(50, 95, 99), window_seconds=None):
+        """Nearest-rank percentiles, e.g. {'p50': ..., 'p95': ...}; None without samples"""
+        samples = sorted(self.values(window_seconds))
+        if not samples:
+            return {f"p{p}": None for p in percentiles}
+        return {
+            f"p{p}": round(samples[max(0, -(-p * len(samples) // 100) - 1)], 2)
+            for p in percentiles
         }
+    
+    def percentile(self, percentile, window_seconds=None):
+        return self.percentiles((percentile,), window_seconds)[f"p{percentile}"]
+    
+    def mean(self, window_seconds=None):
+        samples = self.values(window_seconds)
+        return sum(samples) / len(samples) if samples else 0
+
+class AutoFailover:
+    def __init__(self, registry=None):
+        self.registry = registry or domain_registry
+        self.domains = {}
+        self._lock = threading.Lock()
+        self.active_domain = None
+        self.sync_domains()  # Starts on the registry's primary domain
         
-        self.active_domain = 'blackhole'  # Primary domain
         self.failover_threshold = 3  # Failures before failover
         self.health_check_interval = 30  # seconds
+        self.health_check_jitter = 0.1  # +/- fraction of the interval
         self.timeout = 10  # seconds
         
+        # Latency-based health: a 200 response is only HEALTHY while the
+        # domain's health_percentile over health_window stays under the limit
+        self.health_percentile = 95
+        self.health_latency_threshold = 5000  # ms
+        self.health_window = 300  # seconds
+        # Optional tail-latency failover trigger for the active domain (ms, None = off)
+        self.failover_percentile = 99
+        self.failover_latency_threshold = None
+        # Windows (seconds) reported by get_health_report
+        self.latency_windows = {'5m': 300, '1h': 3600}
+        
+        self._scheduler = None
+        self._stop_event = threading.Event()
+        self.last_health_check = None
+        
+    def sync_domains(self):
+        """Track every domain in the registry, dropping ones that were removed
+        
+        Re-registered domains pick up their new health URL and priority but
+        keep their status and latency history. If the active domain was
+        removed, fail over to the best available domain, or to the
+        registry's primary when none has reported healthy.
+        """
+        with self._lock:
+            for domain_key, config in self.registry.domains.items():
+                if domain_key not in self.domains:
+                    self.domains[domain_key] = {
+                        'status': DomainStatus.UNKNOWN,
+                        'last_check': None,
+                        'failure_count': 0,
+                        'latency': LatencyWindow()
+                    }
+                self.domains[domain_key]['url'] = config['health_url']
+                self.domains[domain_key]['priority'] = config['priority']
+            for domain_key in set(self.domains) - set(self.registry.domains):
+                del self.domains[domain_key]
+            if self.active_domain not in self.domains:
+                self.active_domain = self.registry.best_domain() or self.registry.primary
+    
     def check_domain_health(self, domain_key):
         """Check health of a specific domain"""
         domain = self.domains[domain_key]
@@ -44,65 +121,121 @@ class AutoFailover:
             response = requests.get(domain['url'], timeout=self.timeout)
             response_time = (time.time() - start_time) * 1000  # ms
             
-            # Update response times (keep last 10)
-            domain['response_times'].append(response_time)
-            if len(domain['response_times']) > 10:
-                domain['response_times'].pop(0)
-            
-            domain['last_check'] = datetime.now()
-            
-            if response.status_code == 200:
-                if response_time < 5000:  # Less than 5 seconds
-                    domain['status'] = DomainStatus.HEALTHY
-                    domain['failure_count'] = 0
+            with self._lock:
+                domain['latency'].add(response_time)
+                domain['last_check'] = datetime.now()
+                
+                if response.status_code == 200:
+                    tail_latency = domain['latency'].percentile(self.health_percentile, self.health_window)
+                    if tail_latency < self.health_latency_threshold:
+                        domain['status'] = DomainStatus.HEALTHY
+                        domain['failure_count'] = 0
+                    else:
+                        domain['status'] = DomainStatus.DEGRADED
+                        domain['failure_count'] += 1
                 else:
                     domain['status'] = DomainStatus.DEGRADED
                     domain['failure_count'] += 1
-            else:
-                domain['status'] = DomainStatus.DEGRADED
-                domain['failure_count'] += 1
+                
+                self._update_rank(domain_key)
                 
         except requests.exceptions.Timeout:
-            domain['status'] = DomainStatus.DOWN
-            domain['failure_count'] += 1
-            domain['last_check'] = datetime.now()
+            self._record_failure(domain_key, DomainStatus.DOWN)
             
         except requests.exceptions.ConnectionError:
-            domain['status'] = DomainStatus.DOWN
-            domain['failure_count'] += 1
-            domain['last_check'] = datetime.now()
+            self._record_failure(domain_key, DomainStatus.DOWN)
             
         except Exception as e:
-            domain['status'] = DomainStatus.UNKNOWN
+            self._record_failure(domain_key, DomainStatus.UNKNOWN)
+        
+        return domain['status']
+    
+    def _record_failure(self, domain_key, status):
+        domain = self.domains[domain_key]
+        with self._lock:
+            domain['status'] = status
             domain['failure_count'] += 1
             domain['last_check'] = datetime.now()
+            self._update_rank(domain_key)
+    
+    def _update_rank(self, domain_key):
+        """Push a domain's current health rank to the registry heap (caller holds the lock)
         
-        return domain['status']
+        Healthy domains rank first, then lower observed tail latency
+        (health_percentile over health_window), then priority.
+        """
+        domain = self.domains[domain_key]
+        if domain['status'] not in (DomainStatus.HEALTHY, DomainStatus.DEGRADED):
+            self.registry.mark_unavailable(domain_key)
+            return
+        
+        tail_latency = domain['latency'].percentile(self.health_percentile, self.health_window)
+        self.registry.update_health(domain_key, (
+            domain['status'] != DomainStatus.HEALTHY,
+            tail_latency if tail_latency is not None else float('inf'),
+            -domain['priority']
+        ))
     
     def check_all_domains(self):
-        """Check health of all domains"""
-        health_report = {}
-        for domain_key in self.domains:
-            status = self.check_domain_health(domain_key)
-            health_report[domain_key] = {
-                'status': status.value,
-                'failure_count': self.domains[domain_key]['failure_count'],
-                'avg_response_time': self._get_avg_response_time(domain_key),
-                'last_check': self.domains[domain_key]['last_check'].isoformat() if self.domains[domain_key]['last_check'] else None
-            }
+        """Probe all domains concurrently and return the fresh health report"""
+        self.sync_domains()
+        with ThreadPoolExecutor(max_workers=max(1, len(self.domains))) as executor:
+            list(executor.map(self.check_domain_health, list(self.domains)))
         
-        return health_report
+        self.last_health_check = datetime.now()
+        return self.get_health_report()
+    
+    def get_health_report(self):
+        """Health report from the latest probe results, without any network calls"""
+        with self._lock:
+            return {
+                domain_key: {
+                    'status': domain['status'].value,
+                    'failure_count': domain['failure_count'],
+                    'avg_response_time': self._get_avg_response_time(domain_key),
+                    'latency_percentiles': {
+                        name: domain['latency'].percentiles(window_seconds=seconds)
+                        for name, seconds in self.latency_windows.items()
+                    },
+                    'last_check': domain['last_check'].isoformat() if domain['last_check'] else None
+                }
+                for domain_key, domain in self.domains.items()
+            }
+    
+    def start_health_checks(self):
+        """Start probing all domains in the background every health_check_interval"""
+        with self._lock:
+            if self._scheduler is not None and self._scheduler.is_alive():
+                return
+            self._stop_event.clear()
+            self._scheduler = threading.Thread(target=self._run_health_checks, daemon=True)
+            self._scheduler.start()
+    
+    def stop_health_checks(self):
+        self._stop_event.set()
+    
+    def _run_health_checks(self):
+        while not self._stop_event.is_set():
+            try:
+                self.check_all_domains()
+            except Exception as e:
+                print(f"Health check round failed: {e}")
+            
+            # Jitter keeps workers that started together from probing in lockstep
+            spread = self.health_check_interval * self.health_check_jitter
+            self._stop_event.wait(self.health_check_interval + random.uniform(-spread, spread))
     
     def _get_avg_response_time(self, domain_key):
         """Get average response time for domain"""
-        response_times = self.domains[domain_key]['response_times']
-        if not response_times:
-            return 0
-        return round(sum(response_times) / len(response_times), 2)
+        return round(self.domains[domain_key]['latency'].mean(), 2)
     
     def should_failover(self):
         """Determine if failover is needed"""
-        active_domain = self.domains[self.active_domain]
+        active_domain = self.domains.get(self.active_domain)
+        
+        # Active domain was removed from the registry
+        if active_domain is None or self.active_domain not in self.registry.domains:
+            return True
         
         # Check if active domain has too many failures
         if active_domain['failure_count'] >= self.failover_threshold:
@@ -112,27 +245,18 @@ class AutoFailover:
         if active_domain['status'] == DomainStatus.DOWN:
             return True
         
+        # Check if active domain's tail latency is over the failover limit
+        if self.failover_latency_threshold is not None:
+            with self._lock:
+                tail_latency = active_domain['latency'].percentile(self.failover_percentile, self.health_window)
+            if tail_latency is not None and tail_latency > self.failover_latency_threshold:
+                return True
+        
         return False
     
     def get_best_available_domain(self):
-        """Get the best available domain for failover"""
-        # Sort domains by priority and health
-        available_domains = []
-        
-        for domain_key, domain in self.domains.items():
-            if domain['status'] in [DomainStatus.HEALTHY, DomainStatus.DEGRADED]:
-                score = domain['priority']
-                if domain['status'] == DomainStatus.HEALTHY:
-                    score += 10  # Bonus for healthy status
-                
-                available_domains.append((domain_key, score))
-        
-        if not available_domains:
-            return None
-        
-        # Sort by score (higher is better)
-        available_domains.sort(key=lambda x: x[1], reverse=True)
-        return available_domains[0][0]
+        """Get the best available domain for failover (top of the registry's health heap)"""
+        return self.registry.best_domain()
     
     def execute_failover(self):
         """Execute failover to best available domain"""
@@ -140,6 +264,8 @@ class AutoFailover:
             return {'status': 'no_failover_needed', 'active_domain': self.active_domain}
         
         best_domain = self.get_best_available_domain()
+        if not best_domain and self.active_domain not in self.registry.domains:
+            best_domain = self.registry.primary  # Active domain is gone; nothing has reported healthy
         
         if not best_domain:
             return {
@@ -162,11 +288,17 @@ class AutoFailover:
         }
     
     def get_failover_status(self):
-        """Get current failover status"""
+        """Get current failover status from cached health checks
+        
+        Starts the background health checker on first use; until its first
+        round completes, domains report UNKNOWN.
+        """
+        self.start_health_checks()
         return {
             'active_domain': self.active_domain,
-            'domains_health': self.check_all_domains(),
+            'domains_health': self.get_health_report(),
             'failover_threshold': self.failover_threshold,
+            'last_health_check': self.last_health_check.isoformat() if self.last_health_check else None,
             'last_updated': datetime.now().isoformat()
         }
     
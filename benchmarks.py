@@ -0,0 +1,351 @@
+"""Micro-benchmarks for the production hot paths
+
+Usage: python benchmarks.py [name ...]   (no name runs them all)
+"""
+import sys
+import tempfile
+import time
+import requests
+
+def _report(label, timings):
+    timings = sorted(timings)
+    avg = sum(timings) / len(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    scale, unit = (1e6, 'us') if avg < 1e-4 else (1e3, 'ms')
+    print(f"  {label:<28} avg {avg * scale:7.2f} {unit}   p95 {p95 * scale:7.2f} {unit}")
+    return avg
+
+def bench_connector_pooling(calls=200):
+    """Per-call latency of ProductionConnector.read_app_state over HTTPS, bare requests vs pooled sessions"""
+    from local_stub_server import StubDomainServer, generate_self_signed_cert, point_connector_at
+    from prod_connector import ProductionConnector
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certfile, keyfile = generate_self_signed_cert(tmp)
+        with StubDomainServer(certfile=certfile, keyfile=keyfile) as stub:
+            connector = ProductionConnector()
+            point_connector_at(connector, 'blackhole', stub)
+            url = f"{stub.url}/api/v1/status"
+
+            # Before: a fresh connection (TCP + TLS handshake) per call
+            before = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                requests.get(url, timeout=connector.timeout, verify=certfile).json()
+                before.append(time.perf_counter() - start)
+
+            # After: keep-alive connection from the domain's pool
+            session = connector._session('blackhole')
+            session.verify = certfile
+            session.trust_env = False  # Or a CA bundle from the environment overrides verify
+            after = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                assert connector.read_app_state('blackhole')['status'] == 'success'
+                after.append(time.perf_counter() - start)
+            connector.close()
+
+    print(f"connector pooling ({calls} HTTPS status reads)")
+    slow = _report('bare requests.get', before)
+    fast = _report('pooled session', after)
+    print(f"  speedup {slow / fast:.1f}x")
+
+def bench_event_log(records=20000, fsync_each=1000):
+    """Sustained append throughput of the durable bus event log, fsync per record vs batched"""
+    from core.event_log import EventLog
+
+    message = {'timestamp': '2024-01-01T00:00:00', 'event_type': 'deploy.success',
+               'data': {'service': 'api', 'version': '1.2.3'}}
+
+    def run(count, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = EventLog(tmp, **options)
+            timings = []
+            start = time.perf_counter()
+            for seq in range(1, count + 1):
+                t = time.perf_counter()
+                log.append({**message, 'seq': seq, 'id': f"deploy.success_{seq}"})
+                timings.append(time.perf_counter() - t)
+            log.close()
+            return timings, count / (time.perf_counter() - start)
+
+    print(f"event log appends ({fsync_each} fsync-per-record, {records} batched)")
+    slow, slow_rate = run(fsync_each, fsync_batch=1, fsync_interval=0)
+    fast, fast_rate = run(records)
+    _report('fsync every record', slow)
+    _report('fsync batch 256 / 50 ms', fast)
+    print(f"  throughput {slow_rate:,.0f} -> {fast_rate:,.0f} records/s")
+
+def _publish_from_process(path, ready, go, messages):
+    from core.bus_transport import BusTransport
+    from core.sovereign_bus import SovereignMessageBus
+
+    bus = SovereignMessageBus()
+    bus.attach_transport(BusTransport(path))
+    ready.set()
+    go.wait()
+    for i in range(messages):
+        bus.publish('bench.tick', {'sent': time.monotonic(), 'i': i})
+    bus.wait_idle()
+    time.sleep(1)  # Let the writer thread drain before the process exits
+
+def bench_bus_transport(messages=2000, process_counts=(1, 2, 4, 8)):
+    """Cross-process bus delivery over the Unix socket transport, 1 to 8 publisher processes"""
+    import multiprocessing
+    import threading
+    from core.bus_transport import BusTransport
+    from core.sovereign_bus import SovereignMessageBus
+
+    context = multiprocessing.get_context('fork')
+    print(f"bus transport ({messages} messages per publisher process, one receiver)")
+    for processes in process_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = f"{tmp}/bus.sock"
+            receiver = SovereignMessageBus(history_size=1000)
+            latencies = []
+            done = threading.Event()
+
+            def on_tick(message):
+                latencies.append(time.monotonic() - message['data']['sent'])
+                if len(latencies) == processes * messages:
+                    done.set()
+
+            receiver.subscribe('bench.#', on_tick)
+            receiver.attach_transport(BusTransport(path))  # First in, so it hosts the hub
+
+            ready = [context.Event() for _ in range(processes)]
+            go = context.Event()
+            workers = [
+                context.Process(target=_publish_from_process, args=(path, ready[i], go, messages))
+                for i in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            for event in ready:
+                event.wait()
+
+            start = time.perf_counter()
+            go.set()
+            done.wait(60)
+            elapsed = time.perf_counter() - start
+            for worker in workers:
+                worker.join()
+            receiver.transport.close()
+
+        _report(f"{processes} process(es) latency", latencies)
+        print(f"  {'':<28} {len(latencies) / elapsed:,.0f} msgs/s delivered")
+
+def bench_schema_validation(messages=200000):
+    """Per-message cost of EVENT_SCHEMAS validation: compiled checkers vs a schema walk, and on publish"""
+    from core.sovereign_bus import EVENT_SCHEMAS, SovereignMessageBus, validate_event
+
+    def walk_schema(event_type, data):
+        # What validation costs without compiling: iterate the schema per message
+        if not isinstance(data, dict):
+            return 'not an object'
+        for field, expected in EVENT_SCHEMAS.get(event_type, {}).items():
+            allowed = (int, float) if expected is float else expected
+            if field not in data or not isinstance(data[field], allowed):
+                return f"bad field {field}"
+        return None
+
+    event_type = 'uptime.check'
+    payload = {'service': 'api', 'status': 'up', 'response_time': 12.5}
+
+    def per_message_ns(check):
+        start = time.perf_counter()
+        for _ in range(messages):
+            check(event_type, payload)
+        return (time.perf_counter() - start) / messages * 1e9
+
+    def publish_us(mode, count=50000):
+        bus = SovereignMessageBus(history_size=1000, validation=mode)
+        start = time.perf_counter()
+        for _ in range(count):
+            bus.publish(event_type, payload)
+        return (time.perf_counter() - start) / count * 1e6
+
+    print(f"schema validation ({event_type}, {len(EVENT_SCHEMAS[event_type])} fields)")
+    print(f"  {'schema walk':<28} {per_message_ns(walk_schema):7.0f} ns/message")
+    print(f"  {'compiled checker':<28} {per_message_ns(validate_event):7.0f} ns/message")
+    off, strict = publish_us('off'), publish_us('strict')
+    print(f"  {'publish, validation off':<28} {off:7.2f} us/message")
+    print(f"  {'publish, validation strict':<28} {strict:7.2f} us/message  (+{(strict - off) * 1000:.0f} ns)")
+
+def bench_rate_limiter(clients=10000, requests_per_client=100):
+    """SecurityLayer.check_rate_limit at 10k distinct clients: per-client timestamp lists vs sliding-window counters"""
+    import random
+    from collections import defaultdict
+    from security_layer import SecurityLayer, SharedRateLimitStore
+
+    limit, window = 100, 60
+    order = [f"10.0.{i // 256}.{i % 256}_readonly" for i in range(clients)] * requests_per_client
+    random.Random(0).shuffle(order)
+
+    # Before: rebuild the client's list of request times on every check
+    rate_limits = defaultdict(list)
+
+    def list_check(client_id):
+        now = time.time()
+        rate_limits[client_id] = [t for t in rate_limits[client_id] if t > now - window]
+        if len(rate_limits[client_id]) >= limit:
+            return False
+        rate_limits[client_id].append(now)
+        return True
+
+    security = SecurityLayer()
+    security.rate_limit_config['readonly'] = {'requests': limit, 'window': window}
+
+    def measure(check):
+        timings = []
+        for client_id in order:
+            start = time.perf_counter()
+            check(client_id)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    print(f"rate limiter ({clients} clients x {requests_per_client} requests, {limit}/{window}s)")
+    slow = _report('timestamp lists', measure(list_check))
+    fast = _report('sliding-window counters', measure(security.check_rate_limit))
+    print(f"  speedup {slow / fast:.1f}x; {len(security.rate_limiter)} clients tracked")
+
+    # Cross-worker store: same checks, counters batched into a SQLite file
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = SecurityLayer(SharedRateLimitStore(f"{tmp}/rate_limits.db"))
+        shared.rate_limit_config['readonly'] = {'requests': limit, 'window': window}
+        _report('shared SQLite store', measure(shared.check_rate_limit))
+
+def bench_auth(requests_count=20000):
+    """Per-request auth cost in require_auth: full JWT verification vs the token cache, and API key lookup"""
+    import warnings
+    import jwt
+    from security_layer import SecurityLayer
+
+    warnings.simplefilter('ignore')  # The demo secret trips PyJWT's key-length warning
+    security = SecurityLayer()
+    token = security.generate_jwt_token('monitor')
+    api_key = security.api_keys['readonly']
+
+    def measure(check, credential):
+        timings = []
+        for _ in range(requests_count):
+            start = time.perf_counter()
+            assert check(credential)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    # Before: decode and verify every request, scan the key table
+    def verify_every_time(credential):
+        return jwt.decode(credential, security.jwt_secret, algorithms=['HS256']).get('role')
+
+    def scan_api_keys(credential):
+        for role, key in security.api_keys.items():
+            if credential == key:
+                return role
+
+    print(f"auth overhead ({requests_count} dashboard polls with one credential)")
+    slow = _report('jwt.decode per request', measure(verify_every_time, token))
+    fast = _report('verified-token cache', measure(security.validate_jwt_token, token))
+    print(f"  speedup {slow / fast:.1f}x")
+    _report('API key table scan', measure(scan_api_keys, api_key))
+    _report('API key hash lookup', measure(security.validate_api_key, api_key))
+
+def bench_log_matcher(entries=10000, rounds=20):
+    """Labelling a batch of feedback log lines: per-keyword substring checks vs MultiPatternMatcher"""
+    import random
+    from log_pattern_matcher import MultiPatternMatcher
+    from real_feedback_collector import LOG_KEYWORDS
+
+    rng = random.Random(0)
+    vocabulary = ['INFO', 'DEBUG', 'request', 'served', 'in', '12ms', 'cache', 'warm', 'pool',
+                  'user', 'retrying', 'ok', 'error', 'Completed', 'healthy', 'Timeout']
+    batch = [' '.join(rng.choice(vocabulary) for _ in range(12)) for _ in range(entries)]
+
+    # Before: if/elif substring checks, lowercasing each entry once
+    def substring_checks(lines):
+        labels = []
+        for line in lines:
+            line = line.lower()
+            if any(word in line for word in LOG_KEYWORDS['error']):
+                labels.append('error')
+            elif any(word in line for word in LOG_KEYWORDS['success']):
+                labels.append('success')
+            else:
+                labels.append(None)
+        return labels
+
+    matcher = MultiPatternMatcher(LOG_KEYWORDS)
+    assert matcher.classify(batch) == substring_checks(batch)
+
+    def measure(classify):
+        timings = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            classify(batch)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    print(f"log matcher ({entries} entries per batch)")
+    _report('substring checks', measure(substring_checks))
+    _report('MultiPatternMatcher', measure(matcher.classify))
+
+def _rl_learning_lag(num_shards, burst, quiet_events, results):
+    import threading
+    from core.mcp_bridge import integrate_rl_system
+    from core.sovereign_bus import bus
+
+    integrate_rl_system(event_log_dir=None, bus_socket=None, num_shards=num_shards)
+    sent, learned = [], []
+    bus.subscribe('rl.policy_updated',
+                  lambda message: learned.append(time.monotonic()) if message['data']['service'] == 'api' else None)
+
+    # A busy service floods the learner while 'api' publishes now and then
+    def flood():
+        events = [('deploy.success', {'service': 'batch-jobs', 'version': '1.0'})] * 100
+        for _ in range(burst // 100):
+            bus.publish_many(events)
+
+    flooder = threading.Thread(target=flood)
+    start = time.perf_counter()
+    flooder.start()
+    for _ in range(quiet_events):
+        sent.append(time.monotonic())
+        bus.publish('deploy.success', {'service': 'api', 'version': '1.0'})
+        time.sleep(0.005)
+    flooder.join()
+    bus.wait_idle()
+    results.put((time.perf_counter() - start, [done - at for at, done in zip(sent, learned)]))
+
+def bench_rl_shards(burst=20000, quiet_events=50, shard_counts=(1, 8)):
+    """integrate_rl_system learning lag for a quiet service while another floods the bus, one worker vs one per shard"""
+    import multiprocessing
+
+    context = multiprocessing.get_context('spawn')  # A fresh global bus per run
+    print(f"RL learning lag ({quiet_events} 'api' events during a {burst}-event burst from another service)")
+    for num_shards in shard_counts:
+        results = context.Queue()
+        worker = context.Process(target=_rl_learning_lag, args=(num_shards, burst, quiet_events, results))
+        worker.start()
+        elapsed, lags = results.get()
+        worker.join()
+        _report(f"{num_shards} shard worker(s)", lags)
+        print(f"  {'':<28} {burst + quiet_events:,} events learned in {elapsed:.2f} s")
+
+BENCHMARKS = {
+    'pooling': bench_connector_pooling,
+    'event_log': bench_event_log,
+    'transport': bench_bus_transport,
+    'validation': bench_schema_validation,
+    'rate_limit': bench_rate_limiter,
+    'auth': bench_auth,
+    'log_matcher': bench_log_matcher,
+    'rl_shards': bench_rl_shards,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name}. Choose from: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
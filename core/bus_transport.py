@@ -0,0 +1,224 @@
+import fcntl
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+FRAME_HEADER = struct.Struct('!I')  # payload length, then a JSON message
+READY_FRAME = FRAME_HEADER.pack(0)  # Sent by the hub once a new connection will receive relays
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+# Set to share the global bus between processes on this host
+DEFAULT_SOCKET_PATH = os.environ.get('SOVEREIGN_BUS_SOCKET')
+
+def _read_exact(reader, size: int) -> Optional[bytes]:
+    data = reader.read(size)
+    return data if len(data) == size else None
+
+def _read_frame(reader) -> Optional[bytes]:
+    """Read one length-prefixed frame and return it whole, or None at EOF"""
+    header = _read_exact(reader, FRAME_HEADER.size)
+    if header is None:
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"frame of {length} bytes exceeds {MAX_FRAME_BYTES}")
+    payload = _read_exact(reader, length)
+    return None if payload is None else header + payload
+
+class _Connection:
+    """A socket whose writes are queued and sent by a dedicated thread
+
+    The writer drains everything queued since its last send into one
+    sendall, so bursts of small frames cost one syscall. If the peer falls
+    more than max_pending frames behind, the oldest are dropped.
+    """
+
+    def __init__(self, sock: socket.socket, max_pending: int = 10000):
+        self.sock = sock
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run_writer, daemon=True)
+        self._writer.start()
+
+    def send(self, frame: bytes):
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._pending) >= self.max_pending:
+                self._pending.popleft()
+                self.dropped += 1
+            self._pending.append(frame)
+            self._condition.notify()
+
+    def _run_writer(self):
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                if self._closed and not self._pending:
+                    return
+                data = b''.join(self._pending)
+                self._pending.clear()
+            try:
+                self.sock.sendall(data)
+            except OSError:
+                self.close()
+                return
+
+    def close(self):
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+class BusHub:
+    """Relays frames between the processes connected to one Unix socket
+
+    Frames are forwarded as raw bytes to every connection except the one
+    that sent them; the hub never decodes messages.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(64)
+        threading.Thread(target=self._run_accept, daemon=True).start()
+
+    def _run_accept(self):
+        while True:
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            connection = _Connection(sock)
+            with self._lock:
+                # Queued under the lock so it precedes any relayed frame
+                self._connections.add(connection)
+                connection.send(READY_FRAME)
+            threading.Thread(target=self._run_relay, args=(connection,), daemon=True).start()
+
+    def _run_relay(self, connection: _Connection):
+        reader = connection.sock.makefile('rb')
+        try:
+            while True:
+                frame = _read_frame(reader)
+                if frame is None:
+                    break
+                with self._lock:
+                    peers = [peer for peer in self._connections if peer is not connection]
+                for peer in peers:
+                    peer.send(frame)
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+
+    def close(self):
+        self._server.close()
+        with self._lock:
+            connections, self._connections = list(self._connections), set()
+        for connection in connections:
+            connection.close()
+
+class BusTransport:
+    """Connects a SovereignMessageBus to buses in other processes on this host
+
+    Every participant connects to a hub on a Unix domain socket; the first
+    process to find no live hub (decided under a lock file) starts one in a
+    background thread. If the hub's process exits, the others elect a new
+    one and reconnect. Delivery is best effort: messages published while
+    disconnected are not resent.
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH, reconnect_delay: float = 0.1):
+        if not path:
+            raise ValueError("no socket path; pass one or set SOVEREIGN_BUS_SOCKET")
+        self.path = path
+        self.reconnect_delay = reconnect_delay
+        self.origin = os.getpid()
+        self.hub = None
+        self._connection = None
+        self._on_message = None
+        self._closed = False
+
+    def start(self, on_message: Callable[[Dict], None]):
+        """Connect and hand every message from other processes to on_message"""
+        self._on_message = on_message
+        self._connect()
+        threading.Thread(target=self._run_reader, daemon=True).start()
+
+    def _connect(self):
+        with open(f"{self.path}.lock", 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.path)
+            except (FileNotFoundError, ConnectionRefusedError):
+                # No live hub: clear a stale socket file and become the hub
+                if os.path.exists(self.path):
+                    os.unlink(self.path)
+                self.hub = BusHub(self.path)
+                sock.connect(self.path)
+        
+        # Wait until the hub has registered us, so nothing published after
+        # start() returns can be relayed before we are a peer
+        sock.settimeout(5)
+        ready = b''
+        while len(ready) < len(READY_FRAME):
+            chunk = sock.recv(len(READY_FRAME) - len(ready))
+            if not chunk:
+                raise ConnectionError("bus hub closed the connection")
+            ready += chunk
+        sock.settimeout(None)
+        self._connection = _Connection(sock)
+
+    def _run_reader(self):
+        while not self._closed:
+            reader = self._connection.sock.makefile('rb')
+            try:
+                while True:
+                    frame = _read_frame(reader)
+                    if frame is None:
+                        break
+                    self._on_message(json.loads(frame[FRAME_HEADER.size:]))
+            except (OSError, ValueError):
+                pass
+
+            self._connection.close()
+            while not self._closed:
+                time.sleep(self.reconnect_delay)
+                try:
+                    self._connect()
+                    break
+                except OSError:
+                    continue
+
+    def send(self, message: Dict):
+        payload = json.dumps({**message, 'origin': self.origin}, separators=(',', ':')).encode()
+        self._connection.send(FRAME_HEADER.pack(len(payload)) + payload)
+
+    def close(self):
+        self._closed = True
+        if self._connection is not None:
+            self._connection.close()
+        if self.hub is not None:
+            self.hub.close()
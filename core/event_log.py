@@ -0,0 +1,199 @@
+import bisect
+import json
+import os
+import struct
+import threading
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+RECORD_HEADER = struct.Struct('<IIQ')  # payload length, crc32, seq
+INDEX_ENTRY = struct.Struct('<QQ')     # seq, byte offset of its record
+
+class EventLog:
+    """Durable append-only log of bus messages, split into segment files
+
+    Each segment `<first seq>.log` holds length-prefixed records with a
+    CRC32 over seq + payload, and a sparse `<first seq>.idx` of (seq, offset)
+    pairs every `index_interval` records so replay can seek instead of
+    scanning. Appends are buffered and fsynced as a group, once
+    `fsync_batch` records are pending or every `fsync_interval` seconds
+    from a background thread, so a crash loses at most that window. On
+    open, a torn or corrupt tail left by a crash is truncated away.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024,
+                 index_interval: int = 64, fsync_batch: int = 256, fsync_interval: float = 0.05):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.index_interval = index_interval
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+
+        self._lock = threading.Lock()
+        self._log = None
+        self._index = None
+        self._segment_size = 0
+        self._segment_records = 0
+        self._pending = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[:-4]) for name in os.listdir(directory) if name.endswith('.log')
+        )
+        self.next_seq = self._recover()
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if fsync_interval:
+            self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+            self._flusher.start()
+
+    def _path(self, first_seq: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{first_seq:020d}{suffix}")
+
+    def _read_index(self, first_seq: int) -> List[tuple]:
+        try:
+            with open(self._path(first_seq, '.idx'), 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    def _read_records(self, first_seq: int, offset: int = 0) -> Iterator[tuple]:
+        """Yield (seq, payload, end offset) from a segment, stopping at the first bad record"""
+        with open(self._path(first_seq, '.log'), 'rb') as f:
+            f.seek(offset)
+            while True:
+                header = f.read(RECORD_HEADER.size)
+                if len(header) < RECORD_HEADER.size:
+                    return
+                length, crc, seq = RECORD_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload, zlib.crc32(header[8:])) != crc:
+                    return
+                offset += RECORD_HEADER.size + length
+                yield seq, payload, offset
+
+    def _recover(self) -> int:
+        """Truncate a torn tail from the newest segment and reopen it; returns the next seq"""
+        if not self._segments:
+            return 1
+
+        first_seq = self._segments[-1]
+        log_size = os.path.getsize(self._path(first_seq, '.log'))
+        entries = [entry for entry in self._read_index(first_seq) if entry[1] < log_size]
+
+        # Resume scanning from the last indexed record rather than the start
+        last_seq, offset, records = first_seq - 1, 0, 0
+        if entries:
+            offset = entries[-1][1]
+            records = (len(entries) - 1) * self.index_interval
+        for seq, _, end in self._read_records(first_seq, offset):
+            last_seq, offset = seq, end
+            records += 1
+
+        with open(self._path(first_seq, '.log'), 'r+b') as f:
+            f.truncate(offset)
+        with open(self._path(first_seq, '.idx'), 'wb') as f:
+            f.write(b''.join(INDEX_ENTRY.pack(*entry) for entry in entries if entry[1] < offset))
+
+        self._open_segment(first_seq)
+        self._segment_size = offset
+        self._segment_records = records
+        return max(last_seq, first_seq - 1) + 1
+
+    def _open_segment(self, first_seq: int):
+        self._log = open(self._path(first_seq, '.log'), 'ab')
+        self._index = open(self._path(first_seq, '.idx'), 'ab')
+        self._segment_size = 0
+        self._segment_records = 0
+
+    def _roll(self, first_seq: int):
+        """Seal the active segment and start a new one at first_seq"""
+        if self._log is not None:
+            self._sync()
+            self._log.close()
+            self._index.close()
+        self._segments.append(first_seq)
+        self._open_segment(first_seq)
+
+    def append(self, message: Dict, payload: Optional[bytes] = None):
+        """Append a message carrying a 'seq' newer than every logged one
+        
+        payload is the message's compact JSON encoding, if the caller
+        already has it.
+        """
+        seq = message['seq']
+        if payload is None:
+            payload = json.dumps(message, separators=(',', ':')).encode()
+        seq_bytes = struct.pack('<Q', seq)
+        record = RECORD_HEADER.pack(len(payload), zlib.crc32(payload, zlib.crc32(seq_bytes)), seq) + payload
+
+        with self._lock:
+            if seq < self.next_seq:
+                raise ValueError(f"seq {seq} is not after the last logged seq {self.next_seq - 1}")
+            if self._log is None or (self._segment_records and
+                                     self._segment_size + len(record) > self.segment_bytes):
+                self._roll(seq)
+
+            if self._segment_records % self.index_interval == 0:
+                self._index.write(INDEX_ENTRY.pack(seq, self._segment_size))
+            self._log.write(record)
+            self._segment_size += len(record)
+            self._segment_records += 1
+            self.next_seq = seq + 1
+
+            self._pending += 1
+            if self._pending >= self.fsync_batch:
+                self._sync()
+
+    def _sync(self):
+        """Flush and fsync pending records (caller holds the lock)"""
+        self._log.flush()
+        self._index.flush()
+        os.fsync(self._log.fileno())
+        os.fsync(self._index.fileno())
+        self._pending = 0
+
+    def sync(self):
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def _run_flusher(self):
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+
+    def replay(self, from_seq: int = 1) -> Iterator[Dict]:
+        """Yield logged messages with seq >= from_seq, oldest first"""
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+                self._index.flush()
+            segments = list(self._segments)
+        if not segments:
+            return
+
+        # Start in the segment holding from_seq, at its nearest index entry
+        start = max(bisect.bisect_right(segments, from_seq) - 1, 0)
+        entries = self._read_index(segments[start])
+        position = bisect.bisect_right([seq for seq, _ in entries], from_seq) - 1
+        offset = entries[position][1] if position >= 0 else 0
+
+        for first_seq in segments[start:]:
+            for seq, payload, _ in self._read_records(first_seq, offset):
+                if seq >= from_seq:
+                    yield json.loads(payload)
+            offset = 0
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if self._log is not None:
+                self._sync()
+                self._log.close()
+                self._index.close()
+                self._log = None
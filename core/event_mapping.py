@@ -0,0 +1,106 @@
+import json
+import os
+from typing import Callable, Dict, List, Optional
+
+if __package__:
+    from .sovereign_bus import TopicTrie
+else:
+    from sovereign_bus import TopicTrie
+
+DEFAULT_MAPPINGS_PATH = os.environ.get(
+    'EVENT_MAPPINGS',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'config', 'event_mappings.json')
+)
+
+def compile_extractor(spec) -> Callable[[Dict], object]:
+    """Build a function that pulls one value out of an event payload
+
+    A spec is either a constant, or an object with a dotted 'field' path
+    and optional 'map' (lookup table for the raw value), 'scale',
+    'clip' ([low, high]) and 'default' (used when the field is missing or
+    unmapped; without one the event is skipped).
+    """
+    if not isinstance(spec, dict):
+        return lambda data: spec
+
+    path = spec['field'].split('.')
+    lookup = spec.get('map')
+    scale = spec.get('scale', 1)
+    low, high = spec.get('clip', (None, None))
+    default = spec.get('default')
+
+    def extract(data):
+        value = data
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                return default
+            value = value[key]
+
+        if lookup is not None:
+            return lookup.get(str(value), default)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return default
+
+        value *= scale
+        if low is not None:
+            value = max(low, value)
+        if high is not None:
+            value = min(high, value)
+        return value
+
+    return extract
+
+class EventMapper:
+    """Turns bus events into RL (state, reward) pairs from a mapping table
+
+    Each mapping names an event type or topic pattern and gives an
+    extractor spec (see compile_extractor) for every state feature and for
+    the reward. Specs are compiled once; when several patterns match an
+    event, the mapping listed first wins.
+    """
+
+    def __init__(self, mappings: List[Dict]):
+        self._routes = TopicTrie()  # pattern -> index into _compiled, lower wins
+        self._compiled = []
+        for priority, mapping in enumerate(mappings):
+            features = {name: compile_extractor(spec) for name, spec in mapping['state'].items()}
+            self._compiled.append((features, compile_extractor(mapping['reward'])))
+            self._routes.add(mapping['event'], priority)
+
+    @classmethod
+    def from_config(cls, path: str = DEFAULT_MAPPINGS_PATH):
+        """Load mappings from a JSON file of the form {"mappings": [{"event": ..., "state": ..., "reward": ...}]}"""
+        with open(path) as f:
+            return cls(json.load(f)['mappings'])
+
+    def map(self, message: Dict) -> Optional[tuple]:
+        """(state, reward) for a bus message, or None if no mapping covers it"""
+        priorities = self._routes.match(message['event_type'])
+        if not priorities:
+            return None
+        features, reward = self._compiled[min(priorities)]
+
+        data = message.get('data') or {}
+        state = {name: extract(data) for name, extract in features.items()}
+        value = reward(data)
+        if value is None or any(feature is None for feature in state.values()):
+            return None
+        return state, value
+
+    def map_batch(self, messages: List[Dict], errors: Optional[List] = None) -> List[tuple]:
+        """(message, state, reward) for every mappable message, in order
+        
+        A malformed message is skipped without affecting the rest; if an
+        errors list is given, (message, exception) is appended to it.
+        """
+        transitions = []
+        for message in messages:
+            try:
+                mapped = self.map(message)
+            except Exception as e:
+                if errors is not None:
+                    errors.append((message, e))
+                continue
+            if mapped is not None:
+                transitions.append((message, *mapped))
+        return transitions
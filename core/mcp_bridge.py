@@ -1,16 +1,128 @@
 import json
-from flask import Flask, request, jsonify
+import time
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, stream_with_context
 import sys
 import os
 sys.path.append(os.path.dirname(__file__))
-from sovereign_bus import bus
+if __package__:
+    # Imported as core.mcp_bridge: share the core.sovereign_bus instance
+    from .sovereign_bus import bus, TopicTrie, validate_event
+    from .event_log import EventLog
+    from .bus_transport import BusTransport, DEFAULT_SOCKET_PATH
+    from .event_mapping import EventMapper, DEFAULT_MAPPINGS_PATH
+else:
+    from sovereign_bus import bus, TopicTrie, validate_event
+    from event_log import EventLog
+    from bus_transport import BusTransport, DEFAULT_SOCKET_PATH
+    from event_mapping import EventMapper, DEFAULT_MAPPINGS_PATH
+import queue
 import threading
 
+# Event topics relayed to MCP agents through /mcp_outbox
+MCP_OUTBOX_TOPICS = TopicTrie.from_patterns(['rl.#', 'heal.#', 'deploy.#'])
+
+# Largest batch accepted by /mcp_inbox/batch
+MAX_INBOX_BATCH = 10000
+
+# Outbox long-poll and streaming limits (seconds / messages per response)
+OUTBOX_MAX_WAIT = 30
+OUTBOX_SCAN_LIMIT = 500
+OUTBOX_KEEPALIVE = 15
+
+@lru_cache(maxsize=256)
+def outbox_filter(topics: str) -> TopicTrie:
+    """Compiled topic filter for a client's comma-separated patterns"""
+    if not topics:
+        return MCP_OUTBOX_TOPICS
+    return TopicTrie.from_patterns(pattern.strip() for pattern in topics.split(',') if pattern.strip())
+
+def read_outbox(since: int, topics: TopicTrie, wait: float = 0):
+    """Messages after seq `since` that match `topics`, waiting up to `wait` seconds for one
+    
+    Returns (messages, next_cursor, missed). next_cursor is the last seq
+    examined, matching or not, so the client never rescans; missed is True
+    when messages after `since` already aged out of the bus history.
+    """
+    missed = since + 1 < bus.oldest_seq and since < bus.latest_seq
+    deadline = time.monotonic() + wait
+    cursor = since
+    while True:
+        scanned = bus.get_messages_since(cursor, limit=OUTBOX_SCAN_LIMIT)
+        matches = [msg for msg in scanned if topics.match(msg['event_type'])]
+        if scanned:
+            cursor = scanned[-1]['seq']
+        
+        remaining = deadline - time.monotonic()
+        if matches or remaining <= 0:
+            return matches, cursor, missed
+        if not scanned:
+            bus.wait_for_messages(cursor, remaining)
+
+def parse_inbox_batch(body: bytes, content_type: str):
+    """Split a batch body into (event_type, data) pairs or per-event errors
+    
+    Accepts a JSON array, an object with an 'events' array, or
+    newline-delimited JSON. Returns a list with one (event_type, data, error)
+    tuple per event, so one malformed line doesn't sink the whole batch.
+    """
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        raw_events = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                raw_events.append(json.loads(line))
+            except ValueError as e:
+                raw_events.append(e)
+    else:
+        raw_events = json.loads(body)
+        if isinstance(raw_events, dict):
+            raw_events = raw_events.get('events', [])
+        if not isinstance(raw_events, list):
+            raise ValueError("expected a JSON array of events")
+    
+    parsed = []
+    for event in raw_events:
+        if isinstance(event, Exception):
+            parsed.append((None, None, f"invalid JSON: {event}"))
+        elif not isinstance(event, dict):
+            parsed.append((None, None, "event must be an object"))
+        else:
+            event_type = event.get('event_type', 'mcp.message')
+            data = event.get('data', {})
+            parsed.append((event_type, data, validate_event(event_type, data)))
+    return parsed
+
 class MCPBridge:
-    def __init__(self):
+    def __init__(self, inbox_queue_size=100):
         self.app = Flask(__name__)
+        
+        # Accepted inbox batches are published by a background thread, so
+        # agents get their acks without waiting on bus delivery
+        self.inbox_queue = queue.Queue(maxsize=inbox_queue_size)
+        threading.Thread(target=self._run_inbox_publisher, daemon=True).start()
+        
         self.setup_routes()
         
+    def _run_inbox_publisher(self):
+        while True:
+            events = self.inbox_queue.get()
+            try:
+                bus.publish_many(events)
+            except Exception as e:
+                try:
+                    bus.publish('mcp.error', {'error': str(e)})
+                except Exception as report_error:
+                    # Keep draining the queue even when the bus can't take the report
+                    print(f"MCP inbox batch failed: {e}; reporting it failed: {report_error}")
+            finally:
+                self.inbox_queue.task_done()
+    
+    def flush_inbox(self):
+        """Block until every accepted batch has been published"""
+        self.inbox_queue.join()
+        
     def setup_routes(self):
         @self.app.route('/mcp_inbox', methods=['POST'])
         def mcp_inbox():
@@ -27,71 +139,168 @@ class MCPBridge:
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
         
+        @self.app.route('/mcp_inbox/batch', methods=['POST'])
+        def mcp_inbox_batch():
+            """Receive a batch of events (JSON array or NDJSON) with one ack per event"""
+            try:
+                parsed = parse_inbox_batch(request.get_data(), request.content_type or '')
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            if len(parsed) > MAX_INBOX_BATCH:
+                return jsonify({'error': f"batch exceeds {MAX_INBOX_BATCH} events"}), 413
+            
+            accepted = [(event_type, data) for event_type, data, error in parsed if error is None]
+            if accepted:
+                try:
+                    self.inbox_queue.put_nowait(accepted)
+                except queue.Full:
+                    return jsonify({'error': 'inbox busy, retry later'}), 503
+            
+            acks = [
+                {'index': i, 'status': 'accepted', 'event': event_type} if error is None
+                else {'index': i, 'status': 'rejected', 'error': error}
+                for i, (event_type, data, error) in enumerate(parsed)
+            ]
+            return jsonify({
+                'accepted': len(accepted),
+                'rejected': len(parsed) - len(accepted),
+                'acks': acks
+            }), 202
+        
         @self.app.route('/mcp_outbox', methods=['GET'])
         def mcp_outbox():
-            """Send messages to MCP agents"""
+            """Send messages to MCP agents
+            
+            Pass ?since=<last seen seq> to read everything after it, and
+            ?wait=<seconds> to long-poll until a matching message arrives;
+            ?topics=deploy.*,rl.# overrides the default topic filter. Without
+            `since`, returns the matching messages among the last 10.
+            """
             try:
-                # Get recent RL and system events for MCP
-                messages = bus.get_recent_messages(10)
-                mcp_relevant = [
-                    msg for msg in messages 
-                    if msg['event_type'].startswith(('rl.', 'heal.', 'deploy.'))
-                ]
+                since = request.args.get('since', type=int)
+                if since is None:
+                    since = max(bus.latest_seq - 10, 0)
+                wait = min(request.args.get('wait', 0, type=float), OUTBOX_MAX_WAIT)
+                topics = outbox_filter(request.args.get('topics', ''))
                 
-                return jsonify({'messages': mcp_relevant})
+                messages, cursor, missed = read_outbox(since, topics, wait)
+                return jsonify({'messages': messages, 'next_cursor': cursor, 'missed': missed})
             except Exception as e:
                 return jsonify({'error': str(e)}), 400
         
+        @self.app.route('/mcp_outbox/stream', methods=['GET'])
+        def mcp_outbox_stream():
+            """Stream matching messages as Server-Sent Events
+            
+            Resumes after ?since=<seq> or the Last-Event-ID header sent by a
+            reconnecting EventSource; otherwise starts with new messages.
+            """
+            since = request.headers.get('Last-Event-ID', type=int)
+            if since is None:
+                since = request.args.get('since', bus.latest_seq, type=int)
+            topics = outbox_filter(request.args.get('topics', ''))
+            
+            def events(cursor):
+                while True:
+                    messages, cursor, missed = read_outbox(cursor, topics, OUTBOX_KEEPALIVE)
+                    if missed:
+                        yield "event: missed\ndata: {}\n\n"
+                    for msg in messages:
+                        yield f"id: {msg['seq']}\nevent: {msg['event_type']}\ndata: {json.dumps(msg)}\n\n"
+                    if not messages:
+                        yield ": keepalive\n\n"
+            
+            return Response(stream_with_context(events(since)), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache'})
+        
         @self.app.route('/agent_status', methods=['GET'])
         def agent_status():
             """Get all agent statuses"""
             return jsonify(bus.get_agent_status())
+        
+        @self.app.route('/bus_metrics', methods=['GET'])
+        def bus_metrics():
+            """Per-subscriber queue depth, drops and lag"""
+            return jsonify({'subscribers': bus.get_subscriber_metrics()})
     
     def start_bridge(self, port=5001):
         """Start MCP bridge server"""
         self.app.run(host='localhost', port=port, debug=False)
 
 # Setup MCP integration with RL system
-def integrate_rl_system():
-    """Connect RL system to sovereign bus"""
-    from smart_agent import AdaptiveRLAgent
+def integrate_rl_system(event_log_dir=os.environ.get('SOVEREIGN_BUS_LOG_DIR'),
+                        bus_socket=DEFAULT_SOCKET_PATH, event_mappings=DEFAULT_MAPPINGS_PATH, num_shards=8):
+    """Connect RL system to sovereign bus
+    
+    Events become RL states and rewards through the mapping table in
+    event_mappings (see EventMapper), and each of the num_shards agent
+    shards learns from its services' events on its own worker. With an
+    event_log_dir, bus messages are persisted there and the agent's
+    Q-values are rebuilt at startup by replaying the logged policy updates.
+    With a bus_socket, the bus also exchanges events with other processes
+    on this host (e.g. dashboard workers) over that Unix socket.
+    """
+    from agent_pool import ShardedAgentPool, service_of
     from policy_report_generator import generate_dashboard_data
     
-    # Create RL agent instance
-    rl_agent = AdaptiveRLAgent()
+    # One RL agent per service, sharded so concurrent updates stay consistent
+    agent_pool = ShardedAgentPool(num_shards)
+    event_mapper = EventMapper.from_config(event_mappings)
+    
+    if event_log_dir and bus.event_log is None:
+        bus.attach_event_log(EventLog(event_log_dir))
+        
+        # Re-apply each logged update with the state and action originally
+        # used, so the rebuilt Q-table doesn't depend on fresh exploration
+        for msg in bus.replay(event_type='rl.policy_updated'):
+            update = msg['data']
+            state = update.get('state')
+            if state is None:
+                # Logged before updates carried their state
+                mapped = event_mapper.map({'event_type': update.get('learned_from', ''), 'data': {}})
+                state = mapped[0] if mapped else None
+            if state is not None and 'action_taken' in update:
+                agent_pool.update_policy(service_of(update), state, update['action_taken'], update['reward'])
     
-    def on_system_event(msg):
-        """RL agent learns from system events"""
+    if bus_socket and bus.transport is None:
+        bus.attach_transport(BusTransport(bus_socket))
+    
+    def on_system_events(messages):
+        """Each service's RL agent learns from a batch of system events in one pass
+        
+        Runs on the worker of one agent shard at a time. A malformed event
+        is skipped and reported as its own rl.error; the rest of the batch
+        is still learned from.
+        """
+        errors, transitions = [], []
+        for msg, state, reward in event_mapper.map_batch(messages, errors):
+            transitions.append((service_of(msg.get('data')), msg['event_type'], state, reward))
+        
+        for msg, e in errors:
+            bus.publish('rl.error', {'error': str(e), 'event_id': msg.get('id')})
+        if not transitions:
+            return
+        
         try:
-            # Convert system event to RL state
-            event_type = msg['event_type']
-            data = msg['data']
-            
-            # Create state from event
-            if 'deploy.failed' in event_type:
-                state = {'severity': 2, 'error_count': 3, 'system_load': 0.8}
-                reward = -2.0
-            elif 'heal.triggered' in event_type:
-                state = {'severity': 1, 'error_count': 1, 'system_load': 0.6}
-                reward = -0.5
-            elif 'deploy.success' in event_type:
-                state = {'severity': 0, 'error_count': 0, 'system_load': 0.2}
-                reward = 1.0
-            else:
-                return
-            
-            # RL agent learns from event
-            action = rl_agent.get_action(state)
-            rl_agent.update_policy(state, action, reward)
+            actions = agent_pool.learn_batch(
+                [(service, state, reward) for service, _, state, reward in transitions]
+            )
             
-            # Publish RL update to bus
-            drift_metrics = rl_agent.get_policy_drift()
-            bus.publish('rl.policy_updated', {
-                'drift_score': drift_metrics['drift_score'],
-                'reward': reward,
-                'action_taken': action,
-                'learned_from': event_type
-            })
+            # Publish RL updates to bus
+            drift = {service: agent_pool.get_policy_drift(service)['drift_score']
+                     for service, _, _, _ in transitions}
+            bus.publish_many([
+                ('rl.policy_updated', {
+                    'drift_score': drift[service],
+                    'reward': reward,
+                    'action_taken': action,
+                    'learned_from': event_type,
+                    'service': service,
+                    'state': state
+                })
+                for (service, event_type, state, reward), action in zip(transitions, actions)
+            ])
             
         except Exception as e:
             bus.publish('rl.error', {'error': str(e)})
@@ -104,22 +313,26 @@ def integrate_rl_system():
                 dashboard_data = generate_dashboard_data()
                 bus.publish('rl.report_generated', dashboard_data)
             elif command == 'save_policy':
-                rl_agent.save_policy('current_policy.json')
+                agent_pool.save_policy('current_policy.json')
                 bus.publish('rl.policy_saved', {'status': 'success'})
         except Exception as e:
             bus.publish('rl.error', {'error': str(e)})
     
-    # Subscribe to all system events for learning
-    bus.subscribe('deploy.success', on_system_event)
-    bus.subscribe('deploy.failed', on_system_event)
-    bus.subscribe('heal.triggered', on_system_event)
-    bus.subscribe('heal.completed', on_system_event)
-    bus.subscribe('issue.detected', on_system_event)
+    # Subscribe to all system events for learning; async so publishers
+    # (e.g. /mcp_inbox requests) never wait on policy updates, partitioned
+    # like the agent shards so a busy service's backlog only delays its own
+    # shard, and batched so a burst of events is learned from in one pass
+    bus.subscribe('deploy.*', on_system_events, mode='async', batch_size=256,
+                  partitions=agent_pool.num_shards,
+                  partition_key=lambda msg: agent_pool.shard_of(service_of(msg.get('data'))))
+    bus.subscribe('heal.*', on_system_events)
+    bus.subscribe('issue.*', on_system_events)
     
-    # Subscribe to RL commands
-    bus.subscribe('rl.command', on_rl_command)
+    # Subscribe to RL commands; report generation re-trains from logs, so
+    # keep only the newest few pending commands
+    bus.subscribe('rl.command', on_rl_command, mode='async', queue_size=10, backpressure='drop_oldest')
     
-    return rl_agent
+    return agent_pool
 
 if __name__ == "__main__":
     # Start MCP bridge
@@ -1,59 +1,497 @@
 import json
+import os
 import time
-from typing import Dict, List, Callable
+from collections import deque
+from typing import Dict, Iterator, List, Callable, Optional
 from datetime import datetime
 import threading
 
+BACKPRESSURE_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+VALIDATION_MODES = ('strict', 'warn', 'off')
+
+class Subscriber:
+    """A callback with its own bounded queue and worker thread (async dispatch)"""
+    
+    def __init__(self, callback: Callable, mode: str = 'sync', queue_size: int = 1000,
+                 backpressure: str = 'block', batch_size: Optional[int] = None):
+        if mode not in ('sync', 'async'):
+            raise ValueError(f"Unknown dispatch mode: {mode}")
+        if batch_size is not None and mode != 'async':
+            raise ValueError("batch_size requires async dispatch")
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Unknown backpressure policy: {backpressure}")
+        
+        self.callback = callback
+        self.mode = mode
+        self.queue_size = queue_size
+        self.backpressure = backpressure
+        self.batch_size = batch_size  # If set, callback gets lists of up to batch_size messages
+        
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._worker = None
+        if mode == 'async':
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+    
+    def offer(self, message: Dict):
+        """Deliver inline (sync) or enqueue under the backpressure policy (async)"""
+        if self.mode == 'sync':
+            self._deliver(message, time.monotonic())
+            return
+        
+        with self._condition:
+            if len(self._queue) >= self.queue_size:
+                if self.backpressure == 'drop_newest':
+                    self.dropped += 1
+                    return
+                if self.backpressure == 'drop_oldest':
+                    self._queue.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._queue) >= self.queue_size:
+                        self._condition.wait()
+            
+            self._queue.append((time.monotonic(), message))
+            self._condition.notify_all()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._busy = False
+                    self._condition.notify_all()
+                    self._condition.wait()
+                if self.batch_size:
+                    count = min(self.batch_size, len(self._queue))
+                    batch = [self._queue.popleft() for _ in range(count)]
+                    enqueued_at, message = batch[0][0], [message for _, message in batch]
+                else:
+                    enqueued_at, message = self._queue.popleft()
+                self._busy = True
+                self._condition.notify_all()  # Wake publishers blocked on a full queue
+            
+            self._deliver(message, enqueued_at)
+    
+    def _deliver(self, message, enqueued_at: float):
+        lag = time.monotonic() - enqueued_at
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        try:
+            self.callback(message)
+            self.delivered += len(message) if self.batch_size else 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Error in callback: {e}")
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until the queue is drained and no message is being handled"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queue and not self._busy, timeout)
+    
+    def metrics(self) -> Dict:
+        with self._condition:
+            depth = len(self._queue)
+        return {
+            'callback': getattr(self.callback, '__qualname__', repr(self.callback)),
+            'mode': self.mode,
+            'backpressure': self.backpressure,
+            'queue_depth': depth,
+            'queue_size': self.queue_size,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'last_lag_ms': round(self.last_lag * 1000, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3)
+        }
+
+class PartitionedSubscriber:
+    """An async callback spread over several Subscribers, one worker each
+    
+    Every message goes to the partition picked by partition_key(message),
+    so messages with the same key are handled in order by one worker while
+    other partitions proceed alongside it.
+    """
+    
+    def __init__(self, callback: Callable, partitions: int, partition_key: Callable[[Dict], int],
+                 queue_size: int = 1000, backpressure: str = 'block', batch_size: Optional[int] = None):
+        if partitions < 1:
+            raise ValueError("partitions must be at least 1")
+        
+        self.callback = callback
+        self.partition_key = partition_key
+        self.partitions = [
+            Subscriber(callback, 'async', queue_size, backpressure, batch_size) for _ in range(partitions)
+        ]
+    
+    def offer(self, message: Dict):
+        self.partitions[self.partition_key(message) % len(self.partitions)].offer(message)
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every partition has drained its queue"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for partition in self.partitions:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not partition.wait_idle(remaining):
+                return False
+        return True
+    
+    def metrics(self) -> Dict:
+        """Totals over all partitions; lag figures are the worst partition's"""
+        per_partition = [partition.metrics() for partition in self.partitions]
+        metrics = dict(per_partition[0], partitions=len(self.partitions))
+        for key in ('queue_depth', 'queue_size', 'delivered', 'dropped', 'errors'):
+            metrics[key] = sum(m[key] for m in per_partition)
+        for key in ('last_lag_ms', 'max_lag_ms'):
+            metrics[key] = max(m[key] for m in per_partition)
+        return metrics
+
+class TopicTrie:
+    """Maps dotted topic patterns to values, e.g. 'deploy.*' or 'rl.#'
+    
+    Patterns are split on '.'; '*' matches exactly one segment and '#'
+    matches zero or more. Lookups are cached per topic, so once a topic has
+    been seen, routing it is a dict hit no matter how many patterns exist.
+    The cache is cleared whenever a pattern is added.
+    """
+    
+    def __init__(self, cache_size: int = 4096):
+        self._root = {}  # segment -> child node; values live under the None key
+        self._cache = {}
+        self.cache_size = cache_size
+        self.patterns = {}  # pattern -> values, for introspection
+        
+    @classmethod
+    def from_patterns(cls, patterns):
+        trie = cls()
+        for pattern in patterns:
+            trie.add(pattern, pattern)
+        return trie
+    
+    def add(self, pattern: str, value):
+        node = self._root
+        for segment in pattern.split('.'):
+            node = node.setdefault(segment, {})
+        node.setdefault(None, []).append(value)
+        self.patterns.setdefault(pattern, []).append(value)
+        self._cache.clear()
+    
+    def match(self, topic: str) -> tuple:
+        """Values of every pattern matching `topic`, each value once"""
+        values = self._cache.get(topic)
+        if values is None:
+            found = []
+            self._collect(self._root, topic.split('.'), 0, found)
+            values = tuple(dict.fromkeys(found))
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[topic] = values
+        return values
+    
+    def _collect(self, node: Dict, segments: List[str], i: int, found: List):
+        multi = node.get('#')
+        if multi is not None:
+            # '#' swallows segments[i:j] for every j, including none
+            for j in range(i, len(segments) + 1):
+                self._collect(multi, segments, j, found)
+        
+        if i == len(segments):
+            found.extend(node.get(None, ()))
+            return
+        
+        for key in (segments[i], '*'):
+            child = node.get(key)
+            if child is not None:
+                self._collect(child, segments, i + 1, found)
+
 class SovereignMessageBus:
-    def __init__(self):
-        self.listeners = {}
-        self.message_history = []
+    def __init__(self, dispatch_mode: str = 'sync', history_size: int = 10000, event_log=None,
+                 validation: str = os.environ.get('SOVEREIGN_BUS_VALIDATION', 'warn')):
+        if validation not in VALIDATION_MODES:
+            raise ValueError(f"Unknown validation mode: {validation}")
+        
+        self.listeners = TopicTrie()  # topic pattern -> Subscribers
+        self.subscribers = {}  # callback -> Subscriber, shared across event types
+        self.dispatch_mode = dispatch_mode
+        self.validation = validation  # Payload checks on publish: strict rejects, warn logs
+        self.validation_failures = 0
         self.lock = threading.Lock()
+        self._new_messages = threading.Condition(self.lock)
         
-    def subscribe(self, event_type: str, callback: Callable):
-        """Subscribe to event type"""
-        if event_type not in self.listeners:
-            self.listeners[event_type] = []
-        self.listeners[event_type].append(callback)
-    
-    def publish(self, event_type: str, data: Dict):
-        """Publish event to all subscribers"""
-        message = {
-            'timestamp': datetime.now().isoformat(),
-            'event_type': event_type,
-            'data': data,
-            'id': f"{event_type}_{int(time.time())}"
-        }
+        # Message history: a ring of the last history_size messages addressed
+        # by sequence id (slot = seq % size), plus per-event-type seq indexes
+        self.history_size = history_size
+        self._ring = [None] * history_size
+        self._next_seq = 1
+        self._first_seq = 1  # Oldest seq this process has held in the ring
+        self._type_index = {}  # event_type -> deque of seqs, oldest first
+        self._agent_last_seen = {}  # agent -> (seq, timestamp)
+        
+        self.transport = None
+        self.event_log = None
+        if event_log is not None:
+            self.attach_event_log(event_log)
+        
+    def attach_event_log(self, event_log):
+        """Persist every published message to a durable EventLog
+        
+        Must happen before the first publish; sequence ids continue from the
+        last logged message so they stay unique across restarts.
+        """
+        with self.lock:
+            if self._next_seq != self._first_seq:
+                raise RuntimeError("attach the event log before publishing")
+            self.event_log = event_log
+            self._next_seq = self._first_seq = event_log.next_seq
+    
+    @property
+    def latest_seq(self) -> int:
+        """Sequence id of the newest message (0 before the first publish)"""
+        return self._next_seq - 1
+    
+    @property
+    def message_history(self) -> List[Dict]:
+        """All retained messages, oldest first"""
+        return self.get_messages_since(0)
+    
+    @property
+    def oldest_seq(self) -> int:
+        """Sequence id of the oldest message still held in memory"""
+        with self.lock:
+            return self._oldest_seq()
+    
+    def _oldest_seq(self) -> int:
+        return max(self._first_seq, self._next_seq - self.history_size)
+    
+    def _record(self, message: Dict):
+        """Store a message in the ring and indexes (caller holds the lock)
+        
+        The message is checked before anything is written, so a bad one
+        leaves history, indexes and the next seq untouched.
+        """
+        event_type = message['event_type']
+        _check_event_type(event_type)
+        agent = event_type.split('.')[0]
+        seq = self._next_seq
+        slot = seq % self.history_size
+        
+        evicted = self._ring[slot]
+        if evicted is not None:
+            # The evicted message is the oldest of its type, so it heads its index
+            index = self._type_index[evicted['event_type']]
+            index.popleft()
+            if not index:
+                del self._type_index[evicted['event_type']]
+        
+        self._ring[slot] = message
+        self._type_index.setdefault(event_type, deque()).append(seq)
+        self._agent_last_seen[agent] = (seq, message['timestamp'])
+        self._next_seq += 1
+        
+    def subscribe(self, event_type: str, callback: Callable, mode: Optional[str] = None,
+                  queue_size: int = 1000, backpressure: str = 'block', batch_size: Optional[int] = None,
+                  partitions: int = 1, partition_key: Optional[Callable[[Dict], int]] = None):
+        """Subscribe to an event type or topic pattern ('deploy.*', 'rl.#')
+        
+        A message is delivered once per callback, however many of its
+        patterns match. In 'async' mode the callback runs on its own worker
+        thread fed by a bounded queue; when the queue is full, backpressure
+        decides whether the publisher blocks, the oldest queued message is
+        dropped, or the new one is. With batch_size, an async callback
+        instead receives a list of whatever is queued, up to batch_size
+        messages per call. With partitions > 1, an async callback gets that
+        many queues and workers, each message going to the one picked by
+        partition_key(message). A callback subscribed to several event
+        types keeps one set of queues and workers, created with the options
+        of its first subscription.
+        """
+        if partitions > 1 and ((mode or self.dispatch_mode) != 'async' or partition_key is None):
+            raise ValueError("partitions require async dispatch and a partition_key")
         
         with self.lock:
-            self.message_history.append(message)
+            subscriber = self.subscribers.get(callback)
+            if subscriber is None:
+                if partitions > 1:
+                    subscriber = PartitionedSubscriber(callback, partitions, partition_key,
+                                                       queue_size, backpressure, batch_size)
+                else:
+                    subscriber = Subscriber(callback, mode or self.dispatch_mode, queue_size, backpressure, batch_size)
+                self.subscribers[callback] = subscriber
+            self.listeners.add(event_type, subscriber)
+    
+    def publish(self, event_type: str, data: Dict) -> int:
+        """Publish event to all subscribers; returns its seq"""
+        return self.publish_many([(event_type, data)])[0]
+    
+    def publish_many(self, events: List[tuple]) -> List[int]:
+        """Publish (event_type, data) pairs in order with one lock round trip; returns their seqs
+        
+        Payloads are checked against EVENT_SCHEMAS first. In strict mode an
+        invalid payload raises EventValidationError and nothing in the batch
+        is published; in warn mode it is reported and published anyway. An
+        event_type that isn't a non-empty string is rejected in every mode.
+        """
+        for event_type, _ in events:
+            _check_event_type(event_type)  # In every mode: the type routes and indexes the message
+        if self.validation != 'off':
+            self._validate(events)
+        
+        deliveries = []
+        with self.lock:
+            timestamp = datetime.now().isoformat()
+            messages = [
+                {
+                    'timestamp': timestamp,
+                    'event_type': event_type,
+                    'data': data,
+                    'seq': seq,
+                    'id': f"{event_type}_{seq}"
+                }
+                for seq, (event_type, data) in enumerate(events, self._next_seq)
+            ]
+            
+            # Serialize the whole batch before touching any state, so a
+            # payload that isn't JSON leaves no trace in history or the log
+            payloads = None
+            if self.event_log is not None or self.transport is not None:
+                payloads = [json.dumps(message, separators=(',', ':')).encode() for message in messages]
+            
+            for i, message in enumerate(messages):
+                self._record(message)
+                if self.event_log is not None:
+                    self.event_log.append(message, payloads[i])
+                deliveries.append((message, self.listeners.match(message['event_type'])))
+                if self.transport is not None:
+                    self.transport.send(message)
+            self._new_messages.notify_all()
             
         # Notify subscribers
-        if event_type in self.listeners:
-            for callback in self.listeners[event_type]:
-                try:
-                    callback(message)
-                except Exception as e:
-                    print(f"Error in callback: {e}")
-    
-    def get_recent_messages(self, limit: int = 50) -> List[Dict]:
-        """Get recent messages"""
+        for message, subscribers in deliveries:
+            for subscriber in subscribers:
+                subscriber.offer(message)
+        return [message['seq'] for message, _ in deliveries]
+    
+    def _validate(self, events: List[tuple]):
+        for event_type, data in events:
+            error = validate_event(event_type, data)
+            if error is None:
+                continue
+            self.validation_failures += 1
+            if self.validation == 'strict':
+                raise EventValidationError(f"Invalid {event_type} event: {error}")
+            print(f"Invalid {event_type} event: {error}")
+    
+    def attach_transport(self, transport):
+        """Exchange published messages with buses in other processes (see BusTransport)"""
+        self.transport = transport
+        transport.start(self._receive)
+    
+    def _receive(self, message: Dict):
+        """Record and deliver a message published by another process
+        
+        The message keeps its id, timestamp and origin but is given a local
+        seq so history stays contiguous; it is not forwarded again.
+        """
         with self.lock:
-            return self.message_history[-limit:]
+            message = {**message, 'seq': self._next_seq}
+            try:
+                self._record(message)
+            except EventValidationError:
+                return  # Malformed peer message; drop it rather than the connection
+            if self.event_log is not None:
+                self.event_log.append(message)
+            subscribers = self.listeners.match(message['event_type'])
+            self._new_messages.notify_all()
+        
+        for subscriber in subscribers:
+            subscriber.offer(message)
     
-    def get_agent_status(self) -> Dict:
-        """Get status of all agents"""
-        recent = self.get_recent_messages(20)
-        agents = {}
+    def wait_for_messages(self, after_seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until a message newer than after_seq is published; False on timeout"""
+        with self._new_messages:
+            return self._new_messages.wait_for(lambda: self._next_seq - 1 > after_seq, timeout)
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait for every async subscriber to finish its queued messages"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for subscriber in list(self.subscribers.values()):
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not subscriber.wait_idle(remaining):
+                return False
+        return True
+    
+    def get_subscriber_metrics(self) -> List[Dict]:
+        """Queue depth, drops and delivery lag per subscriber"""
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        return [subscriber.metrics() for subscriber in subscribers]
+    
+    def get_recent_messages(self, limit: int = 50, event_type: Optional[str] = None) -> List[Dict]:
+        """Get the last `limit` messages, optionally of one event type, oldest first"""
+        with self.lock:
+            if event_type is None:
+                start = max(self._oldest_seq(), self._next_seq - limit)
+                return [self._ring[seq % self.history_size] for seq in range(start, self._next_seq)]
+            
+            index = self._type_index.get(event_type, ())
+            seqs = [index[-i] for i in range(min(limit, len(index)), 0, -1)]
+            return [self._ring[seq % self.history_size] for seq in seqs]
+    
+    def get_messages_since(self, seq: int, event_type: Optional[str] = None,
+                           limit: Optional[int] = None) -> List[Dict]:
+        """Get retained messages with a sequence id greater than `seq`, oldest first
         
-        for msg in recent:
-            event_type = msg['event_type']
-            agent = event_type.split('.')[0]
+        At most `limit` messages are returned, starting from the oldest match.
+        """
+        with self.lock:
+            if event_type is None:
+                start = max(seq + 1, self._oldest_seq())
+                end = self._next_seq if limit is None else min(self._next_seq, start + limit)
+                return [self._ring[s % self.history_size] for s in range(start, end)]
             
-            if agent not in agents:
-                agents[agent] = {'last_seen': msg['timestamp'], 'status': 'active'}
+            # Walk the type index back to `seq`; cost is the number of matches
+            matches = []
+            for s in reversed(self._type_index.get(event_type, ())):
+                if s <= seq:
+                    break
+                matches.append(s)
+            matches.reverse()
+            if limit is not None:
+                matches = matches[:limit]
+            return [self._ring[s % self.history_size] for s in matches]
+    
+    def replay(self, from_seq: int = 1, event_type: Optional[str] = None) -> Iterator[Dict]:
+        """Yield messages with seq >= from_seq, optionally only those matching a topic pattern
         
-        return agents
+        Reads the durable event log when one is attached, so messages from
+        before a restart are included; otherwise replays retained history.
+        """
+        if self.event_log is not None:
+            messages = self.event_log.replay(from_seq)
+        else:
+            messages = self.get_messages_since(from_seq - 1)
+        
+        topics = TopicTrie.from_patterns([event_type]) if event_type else None
+        for message in messages:
+            if topics is None or topics.match(message['event_type']):
+                yield message
+    
+    def get_agent_status(self) -> Dict:
+        """Get status of agents seen in the last 20 messages"""
+        with self.lock:
+            recent_from = self._next_seq - 20
+            return {
+                agent: {'last_seen': timestamp, 'status': 'active'}
+                for agent, (seq, timestamp) in self._agent_last_seen.items()
+                if seq >= recent_from
+            }
 
 # Global bus instance
 bus = SovereignMessageBus()
@@ -67,4 +505,57 @@ EVENT_SCHEMAS = {
     'rl.policy_updated': {'drift_score': float, 'reward': float},
     'uptime.check': {'service': str, 'status': str, 'response_time': float},
     'issue.detected': {'severity': str, 'message': str, 'service': str}
-}
\ No newline at end of file
+}
+
+class EventValidationError(ValueError):
+    """A payload that doesn't match its EVENT_SCHEMAS entry (raised in strict mode)"""
+
+def _event_type_error(event_type) -> Optional[str]:
+    if not isinstance(event_type, str) or not event_type:
+        return f"event_type must be a non-empty string, got {event_type!r}"
+    return None
+
+def _check_event_type(event_type):
+    error = _event_type_error(event_type)
+    if error is not None:
+        raise EventValidationError(error)
+
+def compile_schema(schema: Dict) -> Callable[[object], Optional[str]]:
+    """Generate a checker function for one schema; it returns an error message or None
+    
+    Fields are required; ints are accepted where a float is expected, but
+    bools never pass as numbers. The checks are unrolled into straight-line
+    code so validating a payload costs a few dict lookups and isinstance calls.
+    """
+    namespace = {}
+    lines = [
+        "def check(data):",
+        "    if not isinstance(data, dict):",
+        "        return 'data must be an object, got ' + type(data).__name__",
+    ]
+    for i, (field, expected) in enumerate(schema.items()):
+        namespace[f'allowed_{i}'] = (int, float) if expected is float else expected
+        no_bool = " or isinstance(value, bool)" if expected in (int, float) else ""
+        lines += [
+            f"    if {field!r} not in data:",
+            f"        return {f'missing field {field!r}'!r}",
+            f"    value = data[{field!r}]",
+            f"    if not isinstance(value, allowed_{i}){no_bool}:",
+            f"        return {f'field {field!r} must be {expected.__name__}, got '!r} + type(value).__name__",
+        ]
+    lines.append("    return None")
+    exec('\n'.join(lines), namespace)
+    return namespace['check']
+
+# One compiled checker per schema; event types without a schema only need a dict payload
+EVENT_VALIDATORS = {event_type: compile_schema(schema) for event_type, schema in EVENT_SCHEMAS.items()}
+_check_payload = compile_schema({})
+
+def register_schema(event_type: str, schema: Dict):
+    """Add or replace an event schema and its compiled checker"""
+    EVENT_SCHEMAS[event_type] = schema
+    EVENT_VALIDATORS[event_type] = compile_schema(schema)
+
+def validate_event(event_type: str, data) -> Optional[str]:
+    """Check an event type and its payload against EVENT_SCHEMAS; returns an error message or None"""
+    return _event_type_error(event_type) or EVENT_VALIDATORS.get(event_type, _check_payload)(data)
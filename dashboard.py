@@ -370,8 +370,8 @@ def execute_failover():
 def get_auth_token():
     """Get JWT token for API access"""
     try:
-        data = request.get_json()
-        api_key = data.get('api_key')
+        data = request.get_json(silent=True)
+        api_key = data.get('api_key') if isinstance(data, dict) else None
         
         role = security.validate_api_key(api_key)
         if not role:
@@ -1,132 +1,263 @@
 import sqlite3
 import json
+import csv
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+# Partitioned table schemas. Each table is stored as one physical table per
+# UTC day (e.g. system_metrics_p20241031) so retention can drop whole days.
+# Ids come from one sequence per logical table (see ID_SEQUENCES_TABLE), so
+# they stay unique across partitions.
+TABLE_SCHEMAS = {
+    'rl_performance': '''
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        drift_score REAL,
+        reward REAL,
+        action TEXT,
+        state_data TEXT,
+        episode INTEGER
+    ''',
+    'system_metrics': '''
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        response_time REAL,
+        memory_usage REAL,
+        cpu_usage REAL,
+        error_count INTEGER,
+        service_name TEXT
+    ''',
+    'anomalies': '''
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        anomaly_score REAL,
+        severity TEXT,
+        features TEXT,
+        description TEXT
+    ''',
+    'predictions': '''
+        id INTEGER PRIMARY KEY,
+        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        risk_level TEXT,
+        confidence REAL,
+        reasons TEXT,
+        recommendations TEXT
+    '''
+}
+
+PARTITION_FORMAT = '%Y%m%d'
+ID_SEQUENCES_TABLE = 'id_sequences'
+EXPORT_CHUNK_SIZE = 5000
+AUTO_VACUUM_INCREMENTAL = 2  # PRAGMA auto_vacuum value
+
 class DatabaseManager:
     def __init__(self, db_path='rl_system.db'):
         self.db_path = db_path
+        self._known_partitions = set()
         self.init_database()
     
     def init_database(self):
-        """Initialize SQLite database with required tables"""
+        """Initialize SQLite database with today's partitions of each table"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # RL Performance table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS rl_performance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                drift_score REAL,
-                reward REAL,
-                action TEXT,
-                state_data TEXT,
-                episode INTEGER
-            )
-        ''')
-        
-        # System Metrics table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS system_metrics (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                response_time REAL,
-                memory_usage REAL,
-                cpu_usage REAL,
-                error_count INTEGER,
-                service_name TEXT
-            )
-        ''')
+        # Only takes effect on a fresh file; lets dropped partitions release pages
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
         
-        # Anomalies table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS anomalies (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                anomaly_score REAL,
-                severity TEXT,
-                features TEXT,
-                description TEXT
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {ID_SEQUENCES_TABLE} (
+                table_name TEXT PRIMARY KEY,
+                last_id INTEGER NOT NULL
             )
         ''')
         
-        # Predictions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS predictions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                risk_level TEXT,
-                confidence REAL,
-                reasons TEXT,
-                recommendations TEXT
-            )
-        ''')
+        now = self._utc_now()
+        for table in TABLE_SCHEMAS:
+            self._migrate_legacy_table(cursor, table)
+            self._ensure_partition(cursor, table, now)
+            self._init_id_sequence(cursor, table)
         
         conn.commit()
+        
+        # Files created before partitioning never had incremental auto-vacuum;
+        # switching an existing file over needs one full VACUUM
+        cursor.execute('PRAGMA auto_vacuum')
+        if cursor.fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
         conn.close()
     
-    def store_rl_performance(self, drift_score, reward, action, state_data, episode):
-        """Store RL performance data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _init_id_sequence(self, cursor, table):
+        """Start a table's id sequence after the largest id already stored in its partitions"""
+        partitions = self._list_partitions(cursor, table)
+        cursor.execute(
+            'SELECT MAX(id) FROM (' + ' UNION ALL '.join(f'SELECT MAX(id) AS id FROM {p}' for p in partitions) + ')'
+        )
+        cursor.execute(
+            f'INSERT OR IGNORE INTO {ID_SEQUENCES_TABLE} (table_name, last_id) VALUES (?, ?)',
+            (table, cursor.fetchone()[0] or 0)
+        )
+    
+    def _next_id(self, cursor, table):
+        """Allocate the next id of a logical table; holds the write lock until commit"""
+        cursor.execute(
+            f'UPDATE {ID_SEQUENCES_TABLE} SET last_id = last_id + 1 WHERE table_name = ?', (table,)
+        )
+        cursor.execute(f'SELECT last_id FROM {ID_SEQUENCES_TABLE} WHERE table_name = ?', (table,))
+        return cursor.fetchone()[0]
+    
+    def _utc_now(self):
+        """Current UTC time, matching SQLite's CURRENT_TIMESTAMP clock"""
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    
+    def _partition_name(self, table, day):
+        """Physical table name holding one UTC day of a logical table"""
+        return f"{table}_p{day.strftime(PARTITION_FORMAT)}"
+    
+    def _ensure_partition(self, cursor, table, day):
+        """Create the partition for the given day if it does not exist yet"""
+        name = self._partition_name(table, day)
+        if name in self._known_partitions:
+            return name
         
-        cursor.execute('''
-            INSERT INTO rl_performance (drift_score, reward, action, state_data, episode)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (drift_score, reward, action, json.dumps(state_data), episode))
+        cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} ({TABLE_SCHEMAS[table]})')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{name}_timestamp ON {name} (timestamp)')
+        self._known_partitions.add(name)
+        return name
+    
+    def _list_partitions(self, cursor, table, since=None):
+        """List partition names of a table, oldest first, optionally from a start time"""
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ?",
+            (f"{table}_p[0-9]*",)
+        )
+        min_day = since.strftime(PARTITION_FORMAT) if since else None
         
-        conn.commit()
-        conn.close()
+        partitions = []
+        for (name,) in cursor.fetchall():
+            day = name[len(table) + 2:]
+            if min_day is None or day >= min_day:
+                partitions.append(name)
+        
+        return sorted(partitions)
     
-    def store_system_metrics(self, response_time, memory_usage, cpu_usage, error_count, service_name):
-        """Store system performance metrics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _migrate_legacy_table(self, cursor, table):
+        """Move rows from a pre-partitioning table into daily partitions, keeping their ids"""
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        )
+        if cursor.fetchone() is None:
+            return
         
-        cursor.execute('''
-            INSERT INTO system_metrics (response_time, memory_usage, cpu_usage, error_count, service_name)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (response_time, memory_usage, cpu_usage, error_count, service_name))
+        cursor.execute(f'PRAGMA table_info({table})')
+        columns = ', '.join(row[1] for row in cursor.fetchall())
         
-        conn.commit()
-        conn.close()
+        cursor.execute(f"SELECT DISTINCT COALESCE(date(timestamp), date('now')) FROM {table}")
+        for (day,) in cursor.fetchall():
+            partition = self._ensure_partition(cursor, table, datetime.strptime(day, '%Y-%m-%d'))
+            cursor.execute(f'''
+                INSERT INTO {partition} ({columns})
+                SELECT {columns} FROM {table}
+                WHERE COALESCE(date(timestamp), date('now')) = ?
+                ORDER BY id
+            ''', (day,))
+        
+        cursor.execute(f'DROP TABLE {table}')
     
-    def store_anomaly(self, anomaly_score, severity, features, description):
-        """Store detected anomaly"""
+    def _insert(self, table, columns, values):
+        """Insert one row into today's partition of a table"""
+        now = self._utc_now()
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('''
-            INSERT INTO anomalies (anomaly_score, severity, features, description)
-            VALUES (?, ?, ?, ?)
-        ''', (anomaly_score, severity, json.dumps(features), description))
+        partition = self._ensure_partition(cursor, table, now)
+        placeholders = ', '.join('?' for _ in range(len(columns) + 2))
+        cursor.execute(f'''
+            INSERT INTO {partition} (id, timestamp, {', '.join(columns)})
+            VALUES ({placeholders})
+        ''', (self._next_id(cursor, table), now.strftime('%Y-%m-%d %H:%M:%S')) + tuple(values))
         
         conn.commit()
         conn.close()
     
-    def store_prediction(self, risk_level, confidence, reasons, recommendations):
-        """Store failure prediction"""
-        conn = sqlite3.connect(self.db_path)
+    def _query(self, conn, table, sql, params=(), since=None):
+        """Run a query against the partitions of a table that overlap a time range
+        
+        The query refers to the combined partitions as {source}.
+        """
+        cursor = conn.cursor()
+        self._ensure_partition(cursor, table, self._utc_now())
+        partitions = self._list_partitions(cursor, table, since)
+        
+        source = '(' + ' UNION ALL '.join(f'SELECT * FROM {p}' for p in partitions) + ')'
+        return pd.read_sql_query(sql.format(source=source), conn, params=params)
+    
+    def _query_latest(self, conn, table, limit, columns='*'):
+        """Fetch the newest rows of a table, reading partitions newest first"""
         cursor = conn.cursor()
+        frames = []
+        remaining = limit
         
-        cursor.execute('''
-            INSERT INTO predictions (risk_level, confidence, reasons, recommendations)
-            VALUES (?, ?, ?, ?)
-        ''', (risk_level, confidence, json.dumps(reasons), json.dumps(recommendations)))
+        for partition in reversed(self._list_partitions(cursor, table)):
+            df = pd.read_sql_query(f'''
+                SELECT {columns} FROM {partition}
+                ORDER BY timestamp DESC
+                LIMIT ?
+            ''', conn, params=(remaining,))
+            if not df.empty:
+                frames.append(df)
+                remaining -= len(df)
+            if remaining <= 0:
+                break
         
-        conn.commit()
-        conn.close()
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+    
+    def store_rl_performance(self, drift_score, reward, action, state_data, episode):
+        """Store RL performance data"""
+        self._insert(
+            'rl_performance',
+            ('drift_score', 'reward', 'action', 'state_data', 'episode'),
+            (drift_score, reward, action, json.dumps(state_data), episode)
+        )
+    
+    def store_system_metrics(self, response_time, memory_usage, cpu_usage, error_count, service_name):
+        """Store system performance metrics"""
+        self._insert(
+            'system_metrics',
+            ('response_time', 'memory_usage', 'cpu_usage', 'error_count', 'service_name'),
+            (response_time, memory_usage, cpu_usage, error_count, service_name)
+        )
+    
+    def store_anomaly(self, anomaly_score, severity, features, description):
+        """Store detected anomaly"""
+        self._insert(
+            'anomalies',
+            ('anomaly_score', 'severity', 'features', 'description'),
+            (anomaly_score, severity, json.dumps(features), description)
+        )
+    
+    def store_prediction(self, risk_level, confidence, reasons, recommendations):
+        """Store failure prediction"""
+        self._insert(
+            'predictions',
+            ('risk_level', 'confidence', 'reasons', 'recommendations'),
+            (risk_level, confidence, json.dumps(reasons), json.dumps(recommendations))
+        )
     
     def get_rl_performance_history(self, limit=100):
         """Get RL performance history"""
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query('''
-            SELECT * FROM rl_performance 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', conn, params=(limit,))
+        df = self._query_latest(conn, 'rl_performance', limit)
         conn.close()
         
         return df.to_dict('records')
@@ -134,12 +265,12 @@ class DatabaseManager:
     def get_system_metrics_history(self, hours=24, limit=1000):
         """Get system metrics history"""
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query('''
-            SELECT * FROM system_metrics 
-            WHERE timestamp > datetime('now', '-{} hours')
+        df = self._query(conn, 'system_metrics', '''
+            SELECT * FROM {source}
+            WHERE timestamp > datetime('now', ?)
             ORDER BY timestamp DESC 
             LIMIT ?
-        '''.format(hours), conn, params=(limit,))
+        ''', params=(f'-{hours} hours', limit), since=self._utc_now() - timedelta(hours=hours))
         conn.close()
         
         return df.to_dict('records')
@@ -147,11 +278,11 @@ class DatabaseManager:
     def get_recent_anomalies(self, hours=24):
         """Get recent anomalies"""
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query('''
-            SELECT * FROM anomalies 
-            WHERE timestamp > datetime('now', '-{} hours')
+        df = self._query(conn, 'anomalies', '''
+            SELECT * FROM {source}
+            WHERE timestamp > datetime('now', ?)
             ORDER BY timestamp DESC
-        '''.format(hours), conn)
+        ''', params=(f'-{hours} hours',), since=self._utc_now() - timedelta(hours=hours))
         conn.close()
         
         return df.to_dict('records')
@@ -159,11 +290,7 @@ class DatabaseManager:
     def get_recent_predictions(self, limit=10):
         """Get recent predictions"""
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query('''
-            SELECT * FROM predictions 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        ''', conn, params=(limit,))
+        df = self._query_latest(conn, 'predictions', limit)
         conn.close()
         
         return df.to_dict('records')
@@ -171,31 +298,27 @@ class DatabaseManager:
     def get_dashboard_summary(self):
         """Get summary data for dashboard"""
         conn = sqlite3.connect(self.db_path)
+        now = self._utc_now()
         
         # Get latest metrics
-        latest_metrics = pd.read_sql_query('''
+        latest_metrics = self._query(conn, 'system_metrics', '''
             SELECT AVG(response_time) as avg_response,
                    AVG(memory_usage) as avg_memory,
                    AVG(cpu_usage) as avg_cpu,
                    SUM(error_count) as total_errors
-            FROM system_metrics 
+            FROM {source} 
             WHERE timestamp > datetime('now', '-1 hour')
-        ''', conn)
+        ''', since=now - timedelta(hours=1))
         
         # Get anomaly count
-        anomaly_count = pd.read_sql_query('''
+        anomaly_count = self._query(conn, 'anomalies', '''
             SELECT COUNT(*) as count 
-            FROM anomalies 
+            FROM {source} 
             WHERE timestamp > datetime('now', '-24 hours')
-        ''', conn)
+        ''', since=now - timedelta(hours=24))
         
         # Get latest prediction
-        latest_prediction = pd.read_sql_query('''
-            SELECT risk_level, confidence 
-            FROM predictions 
-            ORDER BY timestamp DESC 
-            LIMIT 1
-        ''', conn)
+        latest_prediction = self._query_latest(conn, 'predictions', 1, 'risk_level, confidence')
         
         conn.close()
         
@@ -205,33 +328,115 @@ class DatabaseManager:
             'latest_prediction': latest_prediction.to_dict('records')[0] if not latest_prediction.empty else {}
         }
     
-    def export_to_csv(self, table_name, filename=None):
-        """Export table data to CSV"""
+    def _iter_export_chunks(self, conn, table_name, chunk_size):
+        """Yield (columns, rows) chunks of a table, paging each partition by rowid"""
+        cursor = conn.cursor()
+        for partition in self._list_partitions(cursor, table_name):
+            last_rowid = 0
+            while True:
+                cursor.execute(f'''
+                    SELECT rowid, * FROM {partition}
+                    WHERE rowid > ?
+                    ORDER BY rowid
+                    LIMIT ?
+                ''', (last_rowid, chunk_size))
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                
+                columns = [d[0] for d in cursor.description[1:]]
+                last_rowid = rows[-1][0]
+                yield columns, [row[1:] for row in rows]
+                
+                if len(rows) < chunk_size:
+                    break
+    
+    def _table_columns(self, table_name):
+        """(name, declared type) pairs of a table, in schema order"""
+        lines = TABLE_SCHEMAS[table_name].strip().splitlines()
+        return [tuple(line.strip().rstrip(',').split()[:2]) for line in lines]
+    
+    def _arrow_schema(self, table_name):
+        """Arrow schema matching the declared SQLite column types of a table"""
+        types = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+        return pa.schema([
+            pa.field(name, types.get(declared, pa.string()))
+            for name, declared in self._table_columns(table_name)
+        ])
+    
+    def export_to_csv(self, table_name, filename=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Export table data to CSV, streaming chunk_size rows at a time"""
+        if table_name not in TABLE_SCHEMAS:
+            raise ValueError(f"Unknown table: {table_name}")
+        
         if filename is None:
             filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query(f'SELECT * FROM {table_name}', conn)
-        conn.close()
+        try:
+            with open(filename, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow([name for name, _ in self._table_columns(table_name)])
+                
+                for _, rows in self._iter_export_chunks(conn, table_name, chunk_size):
+                    writer.writerows(rows)
+        finally:
+            conn.close()
+        
+        return filename
+    
+    def export_to_parquet(self, table_name, filename=None, chunk_size=EXPORT_CHUNK_SIZE):
+        """Export table data to Parquet, one row group per chunk (requires pyarrow)"""
+        if pq is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        if table_name not in TABLE_SCHEMAS:
+            raise ValueError(f"Unknown table: {table_name}")
+        
+        if filename is None:
+            filename = f"{table_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
+        
+        schema = self._arrow_schema(table_name)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with pq.ParquetWriter(filename, schema) as writer:
+                for columns, rows in self._iter_export_chunks(conn, table_name, chunk_size):
+                    arrays = [
+                        pa.array([row[i] for row in rows], type=schema.field(name).type)
+                        for i, name in enumerate(columns)
+                    ]
+                    writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        finally:
+            conn.close()
         
-        df.to_csv(filename, index=False)
         return filename
     
     def cleanup_old_data(self, days=30):
-        """Clean up data older than specified days"""
+        """Drop whole daily partitions older than specified days
+        
+        Retention is per UTC day: a partition is dropped once every row in it
+        is older than the cutoff, so no row-by-row DELETE is needed.
+        """
+        cutoff = (self._utc_now() - timedelta(days=days)).strftime(PARTITION_FORMAT)
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        tables = ['rl_performance', 'system_metrics', 'anomalies', 'predictions']
-        
-        for table in tables:
-            cursor.execute(f'''
-                DELETE FROM {table} 
-                WHERE timestamp < datetime('now', '-{days} days')
-            ''')
+        dropped = []
+        for table in TABLE_SCHEMAS:
+            for partition in self._list_partitions(cursor, table):
+                if partition[len(table) + 2:] < cutoff:
+                    cursor.execute(f'DROP TABLE {partition}')
+                    self._known_partitions.discard(partition)
+                    dropped.append(partition)
         
         conn.commit()
+        
+        # Hand freed pages back to the filesystem without a full VACUUM; a
+        # plain execute would only run the pragma's first step, one page
+        conn.executescript('PRAGMA incremental_vacuum')
         conn.close()
+        
+        return dropped
 
 # Singleton instance
 db_manager = DatabaseManager()
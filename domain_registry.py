@@ -0,0 +1,120 @@
+import copy
+import heapq
+import itertools
+import json
+import os
+import threading
+
+DEFAULT_ENDPOINTS = {
+    'status': '/api/v1/status',
+    'deploy': '/api/v1/deploy',
+    'restart': '/api/v1/restart',
+    'logs': '/api/v1/logs'
+}
+
+DEFAULT_CONFIG_PATH = os.environ.get(
+    'DOMAINS_CONFIG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config', 'domains.json')
+)
+
+class DomainRegistry:
+    """Production domains shared by ProductionConnector and AutoFailover
+
+    Besides the per-domain config, the registry keeps a heap of available
+    domains keyed on a health rank (lower is better). Updating one domain
+    pushes a new entry and leaves the old one to be skipped lazily, so both
+    update_health and best_domain are O(log n) amortized.
+    """
+
+    def __init__(self, domains=None):
+        self.domains = {}
+        self._heap = []
+        self._live = {}  # domain key -> (rank, sequence) of its current heap entry
+        self._sequence = itertools.count()
+        self._connector_view = None  # Cached connector_domains(), rebuilt after a change
+        self._lock = threading.Lock()
+
+        for config in domains or []:
+            self.register(config['key'], config)
+
+    @classmethod
+    def from_config(cls, path=DEFAULT_CONFIG_PATH):
+        """Load domains from a JSON file of the form {"domains": [{"key": ..., "base_url": ...}]}"""
+        with open(path) as f:
+            return cls(json.load(f)['domains'])
+
+    @property
+    def primary(self):
+        """First configured domain, used as the initial active domain"""
+        return next(iter(self.domains), None)
+
+    def register(self, key, config):
+        """Add or replace a domain; it joins the health heap once it reports healthy"""
+        base_url = config['base_url'].rstrip('/')
+        with self._lock:
+            self.domains[key] = {
+                'base_url': base_url,
+                'health_url': config.get('health_url', base_url + '/'),
+                'api_key': config.get('api_key', ''),
+                'priority': config.get('priority', len(self.domains) + 1),
+                'endpoints': {**DEFAULT_ENDPOINTS, **config.get('endpoints', {})}
+            }
+            self._connector_view = None
+
+    def unregister(self, key):
+        with self._lock:
+            self.domains.pop(key, None)
+            self._live.pop(key, None)
+            self._connector_view = None
+
+    def connector_domains(self):
+        """Connection settings the connectors need, current as of the last register/unregister
+
+        The dict is shared and only rebuilt after a change, so connectors can
+        read it on every call; treat it as read-only.
+        """
+        with self._lock:
+            if self._connector_view is None:
+                self._connector_view = {
+                    key: {
+                        'base_url': config['base_url'],
+                        'api_key': config['api_key'],
+                        'endpoints': copy.deepcopy(config['endpoints'])
+                    }
+                    for key, config in self.domains.items()
+                }
+            return self._connector_view
+
+    def update_health(self, key, rank):
+        """Record a domain as available with the given rank (any comparable, lower is better)"""
+        with self._lock:
+            if key not in self.domains:
+                return
+            sequence = next(self._sequence)
+            self._live[key] = (rank, sequence)
+            heapq.heappush(self._heap, (rank, sequence, key))
+            self._compact()
+
+    def mark_unavailable(self, key):
+        """Drop a domain from best-domain selection until it reports healthy again"""
+        with self._lock:
+            self._live.pop(key, None)
+
+    def best_domain(self):
+        """Best-ranked available domain, or None"""
+        with self._lock:
+            while self._heap:
+                rank, sequence, key = self._heap[0]
+                if self._live.get(key) == (rank, sequence):
+                    return key
+                heapq.heappop(self._heap)  # Superseded or unavailable entry
+            return None
+
+    def _compact(self):
+        """Rebuild the heap when stale entries outnumber live ones"""
+        if len(self._heap) > 2 * len(self._live) + 16:
+            self._heap = [(rank, sequence, key) for key, (rank, sequence) in self._live.items()]
+            heapq.heapify(self._heap)
+
+# Shared registry loaded from config/domains.json (override with DOMAINS_CONFIG)
+domain_registry = DomainRegistry.from_config()
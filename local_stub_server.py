@@ -0,0 +1,144 @@
+import json
+import os
+import ssl
+import subprocess
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from domain_registry import DomainRegistry, domain_registry
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128  # The default backlog of 5 drops bursts of concurrent connects
+
+class StubDomainServer:
+    """Local stand-in for a production domain's /api/v1 endpoints
+
+    Serves the status, logs, deploy and restart endpoints that
+    ProductionConnector talks to, with an optional artificial delay, so
+    connector and collector code can be exercised without live domains.
+    Pass a certfile/keyfile pair to serve HTTPS instead of HTTP.
+    """
+
+    def __init__(self, delay=0.0, logs=None, state=None, certfile=None, keyfile=None,
+                 supports_cursor=False):
+        self.delay = delay
+        self.supports_cursor = supports_cursor  # Honour ?since= and return next_cursor
+        self.logs = logs if logs is not None else [
+            'INFO request completed',
+            'INFO health check ok',
+            'ERROR upstream timeout'
+        ]
+        self.state = state if state is not None else {
+            'cpu_usage': 35,
+            'memory_usage': 50,
+            'response_time': 120,
+            'uptime': '99.9%'
+        }
+        self.request_count = 0
+        self.command_statuses = []  # Queued HTTP codes for upcoming deploy/restart calls
+        self.server = _StubHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self.server.daemon_threads = True
+        self.thread = None
+
+        self.scheme = 'http'
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+            self.scheme = 'https'
+
+    @property
+    def url(self):
+        return f"{self.scheme}://127.0.0.1:{self.server.server_address[1]}"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _reply(self, payload, code=200):
+                stub.request_count += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                body = json.dumps(payload).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == '/api/v1/status':
+                    self._reply(stub.state)
+                elif parsed.path == '/api/v1/logs':
+                    query = parse_qs(parsed.query)
+                    lines = int(query.get('lines', ['100'])[0])
+                    logs = stub.logs
+                    if stub.supports_cursor and 'since' in query:
+                        logs = logs[int(query['since'][0]):]
+                    payload = {'logs': logs[-lines:]}
+                    if stub.supports_cursor:
+                        payload['next_cursor'] = len(stub.logs)
+                    self._reply(payload)
+                else:
+                    self._reply({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                data = json.loads(self.rfile.read(length) or b'{}')
+                if self.path in ('/api/v1/deploy', '/api/v1/restart'):
+                    if stub.command_statuses:
+                        self._reply({'error': 'injected failure'}, stub.command_statuses.pop(0))
+                    else:
+                        self._reply({'status': 'accepted', 'received': data})
+                else:
+                    self._reply({'error': 'not found'}, 404)
+
+            def log_message(self, format, *args):
+                pass  # Keep test output quiet
+
+        return Handler
+
+    def start(self):
+        """Serve requests on a background thread"""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def generate_self_signed_cert(directory):
+    """Create a throwaway certificate for 127.0.0.1 with openssl; returns (certfile, keyfile)"""
+    certfile = os.path.join(directory, 'stub_cert.pem')
+    keyfile = os.path.join(directory, 'stub_key.pem')
+    subprocess.run([
+        'openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes',
+        '-keyout', keyfile, '-out', certfile, '-days', '1',
+        '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'
+    ], check=True, capture_output=True)
+    return certfile, keyfile
+
+def point_connector_at(connector, domain, stub):
+    """Redirect one of a ProductionConnector's domains to a stub server
+
+    The first redirect gives the connector a private copy of the shared
+    registry, so other users of domain_registry still see the real domains.
+    """
+    if connector.registry is domain_registry:
+        connector.registry = DomainRegistry(
+            [{'key': key, **config} for key, config in domain_registry.domains.items()]
+        )
+    connector.registry.register(domain, {**connector.registry.domains[domain], 'base_url': stub.url})
@@ -0,0 +1,31 @@
+import re
+from typing import Dict, List, Optional
+
+class MultiPatternMatcher:
+    """Keyword matcher that classifies log entries by category
+
+    Categories are given in priority order, e.g. {'error': [...], 'success': [...]}.
+    Each entry is labelled with the highest-priority category that has a
+    keyword occurring anywhere in it (case-insensitive substring match), or
+    None. Every category compiles to one regex alternation, so an entry is
+    scanned in C once per category, stopping at the first category that
+    matches.
+    """
+
+    def __init__(self, categories: Dict[str, List[str]]):
+        self.categories = list(categories)
+        self._patterns = [
+            (name, re.compile('|'.join(re.escape(word.lower()) for word in words if word)))
+            for name, words in categories.items()
+            if any(words)
+        ]
+
+    def classify(self, entries: List[str]) -> List[Optional[str]]:
+        """Label each entry with its highest-priority matching category"""
+        return [self._label(entry.lower()) for entry in entries]
+
+    def _label(self, line: str) -> Optional[str]:
+        for name, pattern in self._patterns:
+            if pattern.search(line):
+                return name
+        return None
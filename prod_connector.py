@@ -1,34 +1,73 @@
 import requests
+import hashlib
 import json
-import time
+import os
+import threading
+from concurrent.futures import Future
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from retry_policy import RetryPolicy, retry_scheduler
+from domain_registry import domain_registry
 
 class ProductionConnector:
-    def __init__(self):
-        self.domains = {
-            'blackhole': {
-                'base_url': 'https://blackholeinfiverse.com',
-                'api_key': 'blackhole_api_key_here',
-                'endpoints': {
-                    'status': '/api/v1/status',
-                    'deploy': '/api/v1/deploy',
-                    'restart': '/api/v1/restart',
-                    'logs': '/api/v1/logs'
-                }
-            },
-            'uni_guru': {
-                'base_url': 'https://uni-guru.in',
-                'api_key': 'uni_guru_api_key_here',
-                'endpoints': {
-                    'status': '/api/v1/status',
-                    'deploy': '/api/v1/deploy',
-                    'restart': '/api/v1/restart',
-                    'logs': '/api/v1/logs'
-                }
-            }
-        }
-        self.timeout = 10
-        self.retry_count = 3
+    def __init__(self, retry_policy=None, log_checkpoint_path=None, registry=None):
+        self.registry = registry or domain_registry
+        self.connect_timeout = 3.05
+        self.read_timeout = 10
+        self.pool_maxsize = 10  # Keep-alive connections per domain
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_scheduler = retry_scheduler
+        
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        
+        # Per-domain log tail positions, persisted to log_checkpoint_path if set
+        self.log_checkpoint_path = log_checkpoint_path
+        self._log_positions = None
+        self._log_positions_lock = threading.Lock()
+    
+    @property
+    def domains(self):
+        """Connection settings per domain, read through the registry so runtime changes apply"""
+        return self.registry.connector_domains()
+    
+    @property
+    def timeout(self):
+        """(connect, read) timeout pair passed to every request"""
+        return (self.connect_timeout, self.read_timeout)
+    
+    def _session(self, domain):
+        """Pooled keep-alive session for a domain, created on first use
+        
+        Sessions are keyed by domain and API key, so a domain re-registered
+        with a new key gets a fresh session.
+        """
+        config = self.domains[domain]
+        key = (domain, config['api_key'])
+        session = self._sessions.get(key)
+        if session is not None:
+            return session
+        
+        with self._sessions_lock:
+            if key not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, pool_block=False)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update({
+                    'Authorization': f"Bearer {config['api_key']}",
+                    'Content-Type': 'application/json'
+                })
+                self._sessions[key] = session
+            return self._sessions[key]
+    
+    def close(self):
+        """Close all pooled connections"""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
     
     def read_app_state(self, domain):
         """Read current application state from live domain"""
@@ -36,12 +75,7 @@ class ProductionConnector:
             config = self.domains[domain]
             url = f"{config['base_url']}{config['endpoints']['status']}"
             
-            headers = {
-                'Authorization': f"Bearer {config['api_key']}",
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=self.timeout)
+            response = self._session(domain).get(url, timeout=self.timeout)
             
             if response.status_code == 200:
                 return {
@@ -70,54 +104,81 @@ class ProductionConnector:
         restart_data = {'service': service_name, 'action': 'restart'}
         return self._execute_command(domain, 'restart', restart_data)
     
+    def submit_command(self, domain, command_type, data):
+        """Start a command without blocking and return a Future for its final result
+        
+        Attempts run on the retry scheduler's pool; backoff between retries is
+        held by its timer rather than by a sleeping thread.
+        """
+        future = Future()
+        self.retry_scheduler.call_soon(
+            lambda: self._run_command_attempt(future, domain, command_type, data, 0)
+        )
+        return future
+    
     def _execute_command(self, domain, command_type, data):
-        """Generic command execution with retry logic"""
+        """Generic command execution with retry logic
+        
+        The first attempt runs on the calling thread, so concurrent callers
+        never queue behind each other on the shared scheduler pool; only
+        retries, after their backoff, are run by the scheduler.
+        """
+        future = Future()
+        self._run_command_attempt(future, domain, command_type, data, 0)
+        return future.result()
+    
+    def _run_command_attempt(self, future, domain, command_type, data, attempt):
+        """Run one attempt, then either resolve the future or schedule a retry"""
+        try:
+            result, outcome = self._attempt_command(domain, command_type, data, attempt)
+            delay = self.retry_policy.next_delay(domain, command_type, outcome, attempt)
+        except Exception as e:
+            future.set_exception(e)
+            return
+        
+        if delay is None:
+            result['attempts'] = attempt + 1
+            future.set_result(result)
+        else:
+            self.retry_scheduler.call_later(
+                delay, lambda: self._run_command_attempt(future, domain, command_type, data, attempt + 1)
+            )
+    
+    def _attempt_command(self, domain, command_type, data, attempt):
+        """POST a command once; returns (result, outcome) for the retry policy"""
         config = self.domains[domain]
         url = f"{config['base_url']}{config['endpoints'][command_type]}"
+        result = {'domain': domain, 'command': command_type, 'attempt': attempt + 1}
         
-        headers = {
-            'Authorization': f"Bearer {config['api_key']}",
-            'Content-Type': 'application/json'
-        }
+        try:
+            response = self._session(domain).post(url, json=data, timeout=self.timeout)
+            outcome = self.retry_policy.classify_status(response.status_code)
+            
+            result.update({
+                'status': 'success' if outcome == 'success' else 'failed',
+                'response': response.json() if outcome == 'success' else None,
+                'http_code': response.status_code,
+                'timestamp': datetime.now().isoformat()
+            })
+            return result, outcome
         
-        for attempt in range(self.retry_count):
-            try:
-                response = requests.post(url, json=data, headers=headers, timeout=self.timeout)
-                
-                result = {
-                    'domain': domain,
-                    'command': command_type,
-                    'status': 'success' if response.status_code == 200 else 'failed',
-                    'response': response.json() if response.status_code == 200 else None,
-                    'http_code': response.status_code,
-                    'attempt': attempt + 1,
-                    'timestamp': datetime.now().isoformat()
-                }
-                
-                if response.status_code == 200:
-                    return result
-                    
-            except requests.exceptions.Timeout:
-                if attempt == self.retry_count - 1:
-                    return {
-                        'domain': domain,
-                        'command': command_type,
-                        'status': 'timeout',
-                        'error': 'Domain unresponsive after retries',
-                        'attempts': self.retry_count
-                    }
-                time.sleep(2)  # Wait before retry
-                
-            except Exception as e:
-                return {
-                    'domain': domain,
-                    'command': command_type,
-                    'status': 'error',
-                    'error': str(e),
-                    'attempt': attempt + 1
-                }
+        except requests.exceptions.ConnectTimeout:
+            result.update({'status': 'timeout', 'error': 'Domain unreachable'})
+            return result, 'connect_failed'
+        
+        except requests.exceptions.Timeout:
+            result.update({'status': 'timeout', 'error': 'Domain unresponsive'})
+            return result, 'timeout'
+        
+        except requests.exceptions.ConnectionError as e:
+            # A refused/unresolvable connection never reached the domain
+            refused = isinstance(getattr(e.args[0], 'reason', None), NewConnectionError) if e.args else False
+            result.update({'status': 'error', 'error': str(e)})
+            return result, 'connect_failed' if refused else 'connection_error'
         
-        return {'status': 'failed', 'error': 'Max retries exceeded'}
+        except Exception as e:
+            result.update({'status': 'error', 'error': str(e)})
+            return result, 'error'
     
     def get_live_logs(self, domain, lines=100):
         """Fetch recent logs from live domain"""
@@ -125,12 +186,7 @@ class ProductionConnector:
             config = self.domains[domain]
             url = f"{config['base_url']}{config['endpoints']['logs']}?lines={lines}"
             
-            headers = {
-                'Authorization': f"Bearer {config['api_key']}",
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(url, headers=headers, timeout=self.timeout)
+            response = self._session(domain).get(url, timeout=self.timeout)
             
             if response.status_code == 200:
                 return {
@@ -144,6 +200,121 @@ class ProductionConnector:
                 
         except Exception as e:
             return {'status': 'error', 'error': str(e)}
+    
+    def tail_logs(self, domain, lines=100, commit=True):
+        """Fetch only the log entries that arrived since the previous tail_logs call
+        
+        Sends the last cursor as `since` so servers that support it return just
+        the new entries (and a `next_cursor`). Otherwise the overlap with the
+        previous window is dropped by comparing fingerprints of the entries
+        already seen (see _count_seen). Positions survive restarts via
+        log_checkpoint_path. With commit=False the new position is returned
+        as 'position' for commit_log_position instead of being saved, so a
+        caller that gives up on the call doesn't lose those entries.
+        """
+        with self._log_positions_lock:
+            position = dict(self._load_log_positions().get(domain, {}))
+        
+        params = {'lines': lines}
+        if position.get('cursor') is not None:
+            params['since'] = position['cursor']
+        
+        try:
+            config = self.domains[domain]
+            url = f"{config['base_url']}{config['endpoints']['logs']}"
+            response = self._session(domain).get(url, params=params, timeout=self.timeout)
+            
+            if response.status_code != 200:
+                return {'status': 'error', 'error': f"HTTP {response.status_code}"}
+            payload = response.json()
+        except Exception as e:
+            return {'status': 'error', 'error': str(e)}
+        
+        window = payload.get('logs', [])
+        cursor = payload.get('next_cursor')
+        fingerprints = [self._log_fingerprint(entry) for entry in window]
+        
+        if 'since' in params and cursor is not None:
+            new_logs = window
+        else:
+            new_logs = window[self._count_seen(fingerprints, position.get('tail', []), position.get('whole', False)):]
+        
+        updated = {
+            'cursor': cursor,
+            'tail': (position.get('tail', []) + fingerprints[len(window) - len(new_logs):])[-lines:],
+            'whole': 'since' not in params and len(window) < lines  # Window held the entire log
+        }
+        result = {
+            'status': 'success',
+            'logs': new_logs,
+            'domain': domain,
+            'cursor': cursor,
+            'timestamp': datetime.now().isoformat()
+        }
+        if commit:
+            self.commit_log_position(domain, updated)
+        else:
+            result['position'] = updated
+        return result
+    
+    def commit_log_position(self, domain, position):
+        """Save a position returned by tail_logs(commit=False)"""
+        with self._log_positions_lock:
+            positions = self._load_log_positions()
+            if positions.get(domain) != position:
+                positions[domain] = position
+                self._save_log_positions()
+    
+    def _log_fingerprint(self, entry):
+        """Short stable hash of a log entry (string or structured)"""
+        text = entry if isinstance(entry, str) else json.dumps(entry, sort_keys=True)
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+    
+    def _count_seen(self, fingerprints, tail, whole):
+        """Number of leading window entries already returned by the previous call
+        
+        tail holds fingerprints of the entries seen last, oldest first. When
+        the previous window was the whole log and still starts this one,
+        everything after it is new, however repetitive the lines. Otherwise
+        the window is taken to start with the longest end of tail it
+        matches.
+        
+        That guess is wrong for periodic logs. Say the last window was
+        A,B,A,B and two more lines A,B arrive: the new window A,B,A,B
+        matches the whole tail, so the new lines are dropped. When the
+        overlap is longer than the stored tail (a call with more lines than
+        the last one), seen lines can be returned a second time instead.
+        Fingerprints alone can't tell these cases apart; exact delivery
+        needs a server with cursor support.
+        """
+        if whole and fingerprints[:len(tail)] == tail:
+            return len(tail)
+        for size in range(min(len(tail), len(fingerprints)), 0, -1):
+            if fingerprints[:size] == tail[-size:]:
+                return size
+        return 0
+    
+    def _load_log_positions(self):
+        """Per-domain tail positions, read from the checkpoint on first use"""
+        if self._log_positions is None:
+            self._log_positions = {}
+            if self.log_checkpoint_path and os.path.exists(self.log_checkpoint_path):
+                try:
+                    with open(self.log_checkpoint_path) as f:
+                        self._log_positions = json.load(f)
+                except (OSError, ValueError):
+                    pass  # Corrupt checkpoint: start from the live window
+        return self._log_positions
+    
+    def _save_log_positions(self):
+        """Atomically rewrite the checkpoint file"""
+        if not self.log_checkpoint_path:
+            return
+        
+        tmp_path = f"{self.log_checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._log_positions, f, separators=(',', ':'))
+        os.replace(tmp_path, self.log_checkpoint_path)
 
 if __name__ == "__main__":
     connector = ProductionConnector()
@@ -9,7 +9,7 @@ from real_feedback_collector import RealFeedbackCollector
 class ProductionTestRunner:
     def __init__(self):
         self.agent = SmartRLAgent(production_mode=True)
-        self.feedback_collector = RealFeedbackCollector()
+        self.feedback_collector = RealFeedbackCollector(log_checkpoint_path='log_tail_checkpoint.json')
         self.test_results = []
         
     def run_failure_test_case(self, test_name, domain, failure_scenario, expected_action):
@@ -1,14 +1,42 @@
 import json
 import time
-from datetime import datetime, timedelta
+import heapq
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
 from prod_connector import ProductionConnector
+from log_pattern_matcher import MultiPatternMatcher
+
+# Log keywords by category, highest priority first: an entry containing
+# any error word counts as an error even if it also mentions success
+LOG_KEYWORDS = {
+    'error': ['error', 'failed', 'timeout', 'critical'],
+    'success': ['success', 'completed', 'ok', 'healthy']
+}
+
+# Upper bound on collect_many's threads; each domain needs two (state and logs)
+MAX_COLLECT_WORKERS = 32
 
 class RealFeedbackCollector:
-    def __init__(self):
-        self.prod_connector = ProductionConnector()
+    def __init__(self, reward_retention_hours=168, log_checkpoint_path=None):
+        self.prod_connector = ProductionConnector(log_checkpoint_path=log_checkpoint_path)
         self.feedback_history = []
-        self.reward_memory = []
         self.last_collection_time = {}
+        self.log_matcher = MultiPatternMatcher(LOG_KEYWORDS)
+        
+        # Rewards per domain, kept in time order with parallel epoch timestamps
+        # so recent-reward queries can binary search instead of scanning
+        self.reward_retention_hours = reward_retention_hours
+        self._reward_times = {}
+        self._rewards = {}
+        self._reward_count = 0
+    
+    @property
+    def reward_memory(self):
+        """All retained reward entries across domains, oldest first"""
+        return self._merge_by_time(
+            zip(self._reward_times[domain], self._rewards[domain]) for domain in self._rewards
+        )
     
     def collect_domain_feedback(self, domain, action_timestamp):
         """Collect real feedback from live domain after action execution"""
@@ -16,35 +44,140 @@ class RealFeedbackCollector:
             # Get current domain state
             current_state = self.prod_connector.read_app_state(domain)
             
-            # Get recent logs to analyze impact
-            logs_response = self.prod_connector.get_live_logs(domain, lines=50)
+            # Get logs written since the last collection to analyze impact
+            logs_response = self.prod_connector.tail_logs(domain, lines=50)
             
-            if current_state['status'] == 'success' and logs_response['status'] == 'success':
-                feedback = self._analyze_feedback(
-                    domain, 
-                    current_state['data'], 
-                    logs_response['logs'],
-                    action_timestamp
+            return self._build_feedback(domain, current_state, logs_response, action_timestamp)
+                
+        except Exception as e:
+            return self._error_feedback(domain, e)
+    
+    def collect_many(self, domains, action_timestamp=None, deadline=15, deadlines=None, max_workers=None):
+        """Collect feedback from several domains concurrently
+        
+        State and logs for every domain are fetched in parallel. Each domain
+        gets `deadline` seconds (overridable per domain via `deadlines`);
+        domains that miss it report a 'timeout' status without holding up
+        the others. At most MAX_COLLECT_WORKERS requests (or max_workers)
+        run at once, and queued ones spend their domain's deadline waiting.
+        Returns a dict of domain -> feedback.
+        """
+        deadlines = deadlines or {}
+        if action_timestamp is None:
+            action_timestamp = datetime.now().isoformat()
+        
+        start = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=max_workers or max(1, min(2 * len(domains), MAX_COLLECT_WORKERS)))
+        try:
+            pending = {
+                domain: (
+                    executor.submit(self.prod_connector.read_app_state, domain),
+                    executor.submit(self.prod_connector.tail_logs, domain, 50, False)
                 )
+                for domain in domains
+            }
+            
+            # Wait on the tightest deadlines first so each wait is bounded by its own budget
+            results = {}
+            collected = {}
+            for domain in sorted(pending, key=lambda d: deadlines.get(d, deadline)):
+                futures = pending[domain]
+                limit = deadlines.get(domain, deadline)
+                remaining = limit - (time.monotonic() - start)
+                done, _ = wait(futures, timeout=max(0, remaining))
                 
-                self.feedback_history.append(feedback)
-                return feedback
-            else:
-                return {
-                    'status': 'collection_failed',
-                    'domain': domain,
-                    'error': 'Could not collect domain state or logs'
-                }
+                if len(done) < len(futures):
+                    for future in futures:
+                        future.cancel()
+                    results[domain] = {
+                        'status': 'timeout',
+                        'domain': domain,
+                        'error': f"No response within {limit}s",
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    continue
                 
-        except Exception as e:
+                try:
+                    collected[domain] = tuple(future.result() for future in futures)
+                except Exception as e:
+                    results[domain] = self._error_feedback(domain, e)
+                    continue
+                
+                # Only a tail that made its deadline moves the log position;
+                # a late one is discarded and its entries are read next time
+                logs = collected[domain][1]
+                if 'position' in logs:
+                    self.prod_connector.commit_log_position(domain, logs.pop('position'))
+        finally:
+            # Don't block on calls that overran their deadline
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        # Classify every domain's log window in a single pass
+        log_counts = self.analyze_log_batches({
+            domain: logs['logs'] for domain, (_, logs) in collected.items()
+            if logs['status'] == 'success'
+        })
+        for domain, (state, logs) in collected.items():
+            results[domain] = self._build_feedback(
+                domain, state, logs, action_timestamp, log_counts.get(domain)
+            )
+        
+        return {domain: results[domain] for domain in domains}
+    
+    def analyze_log_batches(self, logs_by_domain):
+        """Count error and success log entries for many domains in one pass
+        
+        Returns a dict of domain -> {'error_count', 'success_count', 'error_ratio'}.
+        """
+        owners = []
+        entries = []
+        for domain, logs in logs_by_domain.items():
+            for log_entry in logs:
+                if isinstance(log_entry, str):
+                    owners.append(domain)
+                    entries.append(log_entry)
+        
+        counts = {domain: {'error_count': 0, 'success_count': 0} for domain in logs_by_domain}
+        for domain, label in zip(owners, self.log_matcher.classify(entries)):
+            if label is not None:
+                counts[domain][f"{label}_count"] += 1
+        
+        for domain_counts in counts.values():
+            total = domain_counts['error_count'] + domain_counts['success_count']
+            domain_counts['error_ratio'] = domain_counts['error_count'] / total if total > 0 else 0
+        
+        return counts
+    
+    def _build_feedback(self, domain, current_state, logs_response, action_timestamp, log_counts=None):
+        """Turn a state read and log fetch into feedback, recording successes"""
+        if current_state['status'] == 'success' and logs_response['status'] == 'success':
+            feedback = self._analyze_feedback(
+                domain, 
+                current_state['data'], 
+                logs_response['logs'],
+                action_timestamp,
+                log_counts
+            )
+            
+            self.feedback_history.append(feedback)
+            return feedback
+        else:
             return {
-                'status': 'error',
+                'status': 'collection_failed',
                 'domain': domain,
-                'error': str(e),
-                'timestamp': datetime.now().isoformat()
+                'error': 'Could not collect domain state or logs'
             }
     
-    def _analyze_feedback(self, domain, state_data, logs, action_timestamp):
+    def _error_feedback(self, domain, error):
+        """Feedback entry for a collection that raised"""
+        return {
+            'status': 'error',
+            'domain': domain,
+            'error': str(error),
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def _analyze_feedback(self, domain, state_data, logs, action_timestamp, log_counts=None):
         """Analyze domain state and logs to generate feedback"""
         feedback = {
             'domain': domain,
@@ -63,20 +196,10 @@ class RealFeedbackCollector:
         if 'uptime' in state_data:
             feedback['metrics']['uptime'] = state_data['uptime']
         
-        # Analyze logs for error patterns
-        error_count = 0
-        success_count = 0
-        
-        for log_entry in logs:
-            if isinstance(log_entry, str):
-                if any(error_word in log_entry.lower() for error_word in ['error', 'failed', 'timeout', 'critical']):
-                    error_count += 1
-                elif any(success_word in log_entry.lower() for success_word in ['success', 'completed', 'ok', 'healthy']):
-                    success_count += 1
-        
-        feedback['metrics']['error_count'] = error_count
-        feedback['metrics']['success_count'] = success_count
-        feedback['metrics']['error_ratio'] = error_count / (error_count + success_count) if (error_count + success_count) > 0 else 0
+        # Analyze logs for error patterns (pre-computed when collecting in batch)
+        if log_counts is None:
+            log_counts = self.analyze_log_batches({domain: logs})[domain]
+        feedback['metrics'].update(log_counts)
         
         # Calculate overall health score
         health_score = self._calculate_health_score(feedback['metrics'])
@@ -152,24 +275,58 @@ class RealFeedbackCollector:
             'action_reward': action_reward,
             'total_reward': total_reward,
             'timestamp': datetime.now().isoformat(),
-            'feedback_id': len(self.reward_memory)
+            'feedback_id': self._reward_count
         }
         
-        self.reward_memory.append(reward_entry)
+        self._store_reward(reward_entry, time.time())
         return reward_entry
     
+    def _store_reward(self, reward_entry, epoch):
+        """Insert a reward into its domain's time index and expire old entries"""
+        domain = reward_entry['domain']
+        times = self._reward_times.setdefault(domain, [])
+        entries = self._rewards.setdefault(domain, [])
+        
+        # Appends in the common case; only a clock step back lands mid-list
+        index = bisect_right(times, epoch)
+        times.insert(index, epoch)
+        entries.insert(index, reward_entry)
+        self._reward_count += 1
+        
+        self._expire_rewards(domain, time.time())
+    
+    def _expire_rewards(self, domain, now):
+        """Drop a domain's rewards that fall outside the retention window"""
+        times = self._reward_times.get(domain)
+        if not times:
+            return
+        
+        cut = bisect_left(times, now - self.reward_retention_hours * 3600)
+        if cut:
+            del times[:cut]
+            del self._rewards[domain][:cut]
+    
+    def _merge_by_time(self, streams):
+        """Merge per-domain (epoch, entry) streams into one time-ordered list"""
+        return [entry for _, entry in heapq.merge(*streams, key=lambda pair: pair[0])]
+    
     def get_recent_rewards(self, domain=None, hours=24):
-        """Get recent rewards for analysis"""
-        cutoff_time = datetime.now() - timedelta(hours=hours)
+        """Get recent rewards for analysis, oldest first"""
+        now = time.time()
+        cutoff = now - hours * 3600
+        domains = [domain] if domain is not None else list(self._rewards)
         
-        recent_rewards = []
-        for reward in self.reward_memory:
-            reward_time = datetime.fromisoformat(reward['timestamp'])
-            if reward_time >= cutoff_time:
-                if domain is None or reward['domain'] == domain:
-                    recent_rewards.append(reward)
+        streams = []
+        for key in domains:
+            if key not in self._rewards:
+                continue
+            self._expire_rewards(key, now)
+            
+            times = self._reward_times[key]
+            start = bisect_left(times, cutoff)
+            streams.append(zip(times[start:], self._rewards[key][start:]))
         
-        return recent_rewards
+        return self._merge_by_time(streams)
     
     def save_feedback_data(self, filename='real_feedback_data.json'):
         """Save collected feedback and rewards to file"""
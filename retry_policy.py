@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Attempt outcomes where the request certainly was not processed, so a retry
+# is safe even for commands that must not run twice
+UNPROCESSED_OUTCOMES = {'connect_failed', 'throttled'}
+
+# Outcomes where the request may have been processed; only idempotent
+# commands are retried after these
+AMBIGUOUS_OUTCOMES = {'timeout', 'connection_error', 'server_error'}
+
+class RetryPolicy:
+    """Decides whether and when to retry a production command
+
+    Combines capped exponential backoff with full jitter, a per-domain retry
+    budget (each request earns `budget_ratio` retry tokens up to
+    `budget_cap`, each retry spends one) and idempotency awareness: a
+    non-idempotent command such as deploy is only retried when the request
+    never reached the domain. The policy only computes delays; sync and async
+    callers decide how to wait.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=8.0,
+                 budget_ratio=0.2, budget_cap=10.0, idempotent_commands=('restart',)):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_cap = budget_cap
+        self.idempotent_commands = set(idempotent_commands)
+
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def classify_status(self, http_code):
+        """Map an HTTP status code to an attempt outcome"""
+        if http_code == 200:
+            return 'success'
+        if http_code in (429, 503):
+            return 'throttled'
+        if http_code >= 500:
+            return 'server_error'
+        return 'client_error'
+
+    def backoff(self, attempt):
+        """Delay before retry number `attempt` + 1 (full jitter)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def is_retryable(self, command_type, outcome):
+        if outcome in UNPROCESSED_OUTCOMES:
+            return True
+        return outcome in AMBIGUOUS_OUTCOMES and command_type in self.idempotent_commands
+
+    def next_delay(self, domain, command_type, outcome, attempt):
+        """Seconds to wait before retrying, or None to stop
+
+        Call once after every attempt (attempt counts from 0); the first
+        call for a request tops up the domain's retry budget.
+        """
+        with self._lock:
+            tokens = self._budgets.get(domain, self.budget_cap)
+            if attempt == 0:
+                tokens = min(self.budget_cap, tokens + self.budget_ratio)
+
+            retry = (
+                outcome != 'success'
+                and attempt + 1 < self.max_attempts
+                and self.is_retryable(command_type, outcome)
+                and tokens >= 1
+            )
+            if retry:
+                tokens -= 1
+            self._budgets[domain] = tokens
+
+        return self.backoff(attempt) if retry else None
+
+    def remaining_budget(self, domain):
+        with self._lock:
+            return self._budgets.get(domain, self.budget_cap)
+
+class RetryScheduler:
+    """Runs work on a small pool, with delayed work released by one timer thread
+
+    Retries waiting out a backoff sit in a heap rather than in a sleeping
+    worker thread, so the pool only ever holds threads doing real I/O.
+    """
+
+    def __init__(self, max_workers=8):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._heap = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._timer = None
+
+    def call_soon(self, fn):
+        self._executor.submit(fn)
+
+    def call_later(self, delay, fn):
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), fn))
+            if self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, daemon=True)
+                self._timer.start()
+            self._condition.notify()
+
+    def _run_timer(self):
+        while True:
+            with self._condition:
+                while not self._heap:
+                    self._condition.wait()
+                due, _, fn = self._heap[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                heapq.heappop(self._heap)
+            self._executor.submit(fn)
+
+# Shared scheduler for blocking connectors
+retry_scheduler = RetryScheduler()
@@ -1,19 +1,249 @@
 import hashlib
+import os
+import sqlite3
+import threading
 import time
+import zlib
 import jwt
 from functools import wraps
 from flask import request, jsonify
-from collections import defaultdict
+from collections import OrderedDict
+
+class SlidingWindowRateLimiter:
+    """Sliding-window-counter rate limiter with O(1) checks
+    
+    Each client keeps only the request counts of the current and previous
+    fixed windows; the previous count is weighted by how much of it still
+    overlaps the sliding window. Clients are split across lock stripes, each
+    an LRU ordered by last request, so clients idle for two windows (whose
+    counts can no longer matter) are evicted as new requests arrive, and
+    no stripe grows past its share of max_clients.
+    """
+    
+    def __init__(self, max_clients=100000, stripes=16):
+        self.max_clients_per_stripe = max(1, max_clients // stripes)
+        self._stripes = [(OrderedDict(), threading.Lock()) for _ in range(stripes)]
+    
+    def allow(self, client_id, limit, window, now=None):
+        """Count a request for client_id and return whether it is within limit per window seconds"""
+        now = time.time() if now is None else now
+        window_index = int(now // window)
+        clients, lock = self._stripes[zlib.crc32(client_id.encode()) % len(self._stripes)]
+        
+        with lock:
+            entry = clients.get(client_id)
+            if entry is None:
+                entry = clients[client_id] = [window_index, 0, 0, now]  # window, previous, current, last seen
+            else:
+                clients.move_to_end(client_id)
+                if window_index != entry[0]:
+                    entry[1] = entry[2] if window_index == entry[0] + 1 else 0
+                    entry[2] = 0
+                    entry[0] = window_index
+                entry[3] = now
+            
+            self._evict(clients, now - 2 * window)
+            
+            overlap = 1 - (now % window) / window
+            if entry[1] * overlap + entry[2] >= limit:
+                return False
+            entry[2] += 1
+            return True
+    
+    def _evict(self, clients, idle_before):
+        """Drop least recently seen clients that are idle or over capacity (caller holds the lock)"""
+        while clients:
+            client_id, entry = next(iter(clients.items()))
+            if entry[3] >= idle_before and len(clients) <= self.max_clients_per_stripe:
+                return
+            del clients[client_id]
+    
+    def __len__(self):
+        return sum(len(clients) for clients, _ in self._stripes)
+
+class SharedRateLimitStore:
+    """Sliding-window rate-limit counters shared by worker processes through SQLite
+    
+    Gives every gunicorn worker the same view of each client's requests, so
+    the limit holds for the whole server rather than per worker. Workers
+    count admitted requests locally and merge them into the database in one
+    transaction every sync_interval seconds or batch_size requests, then
+    refresh the totals of the clients they served. A worker can therefore
+    miss up to one sync interval of other workers' requests; the overshoot
+    is bounded by what the other workers admit in that time. Uses the same
+    estimate as SlidingWindowRateLimiter and fails open if the database is
+    unavailable. Safe to create before gunicorn forks: each process opens
+    its own connection.
+    """
+    
+    def __init__(self, db_path='rl_rate_limits.db', sync_interval=0.05, batch_size=10):
+        self.db_path = db_path
+        self.sync_interval = sync_interval
+        self.batch_size = batch_size
+        self._reset()
+    
+    def _reset(self):
+        """Start with fresh locks, empty local state and no connection (also after a fork)"""
+        self._lock = threading.Lock()       # Local counters
+        self._sync_lock = threading.Lock()  # SQLite connection
+        self._pid = os.getpid()
+        self._conn = None
+        self._shared = {}   # (client_id, window) -> {window index: count across workers at last sync}
+        self._pending = {}  # (client_id, window, window index) -> admitted here, not yet written
+        self._seen = set()  # (client_id, window) served since the last sync
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._last_cleanup = 0
+    
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rate_limits (
+                    client_id TEXT,
+                    window INTEGER,
+                    window_index INTEGER,
+                    count INTEGER,
+                    expires REAL,
+                    PRIMARY KEY (client_id, window, window_index)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits(expires)')
+            self._conn = conn
+        return self._conn
+    
+    def allow(self, client_id, limit, window, now=None):
+        """Count a request for client_id and return whether it is within limit per window seconds"""
+        if os.getpid() != self._pid:
+            self._reset()
+        
+        now = time.time() if now is None else now
+        index = int(now // window)
+        key = (client_id, window)
+        if key not in self._shared:
+            self._load(key)
+        
+        with self._lock:
+            shared = self._shared.get(key, {})
+            current = shared.get(index, 0) + self._pending.get((client_id, window, index), 0)
+            previous = shared.get(index - 1, 0) + self._pending.get((client_id, window, index - 1), 0)
+            allowed = previous * (1 - (now % window) / window) + current < limit
+            
+            self._seen.add(key)
+            if allowed:
+                pending_key = (client_id, window, index)
+                self._pending[pending_key] = self._pending.get(pending_key, 0) + 1
+                self._unsynced += 1
+            due = (self._unsynced >= self.batch_size or
+                   time.monotonic() - self._last_sync >= self.sync_interval)
+        
+        if due:
+            self.sync(now)
+        return allowed
+    
+    def _load(self, key):
+        """Fetch the shared counts of a client this worker hasn't served recently"""
+        try:
+            with self._sync_lock:
+                rows = self._connection().execute(
+                    'SELECT window_index, count FROM rate_limits WHERE client_id = ? AND window = ?', key
+                ).fetchall()
+        except sqlite3.Error:
+            rows = []
+        with self._lock:
+            self._shared.setdefault(key, dict(rows))
+    
+    def sync(self, now=None):
+        """Write locally admitted requests and refresh the shared counts of recently served clients"""
+        now = time.time() if now is None else now
+        with self._sync_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                seen, self._seen = self._seen, set()
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+                # Count the batch as shared until the refresh below replaces it
+                for (client_id, window, index), count in pending.items():
+                    counts = self._shared.setdefault((client_id, window), {})
+                    counts[index] = counts.get(index, 0) + count
+            
+            try:
+                refreshed = self._write_and_refresh(pending, seen, now)
+            except sqlite3.Error:
+                # Keep the batch for the next attempt; requests stay limited locally meanwhile
+                with self._lock:
+                    for key, count in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + count
+                        counts = self._shared[key[:2]]
+                        counts[key[2]] -= count
+                    self._seen |= seen
+                return
+            
+            with self._lock:
+                for key in seen:
+                    self._shared[key] = refreshed.get(key, {})
+                if now - self._last_cleanup >= 1:
+                    self._last_cleanup = now
+                    for key in [key for key in self._shared if key not in seen]:
+                        counts = self._shared[key]
+                        if not counts or max(counts) < int(now // key[1]) - 1:
+                            del self._shared[key]
+    
+    def _write_and_refresh(self, pending, seen, now):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany('''
+                INSERT INTO rate_limits (client_id, window, window_index, count, expires)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (client_id, window, window_index) DO UPDATE SET count = count + excluded.count
+            ''', [(client_id, window, index, count, (index + 2) * window)
+                  for (client_id, window, index), count in pending.items()])
+            if now - self._last_cleanup >= 1:
+                conn.execute('DELETE FROM rate_limits WHERE expires < ?', (now,))
+            conn.execute('COMMIT')
+        except sqlite3.Error:
+            conn.execute('ROLLBACK')
+            raise
+        
+        refreshed = {}
+        clients = list({client_id for client_id, _ in seen})
+        for start in range(0, len(clients), 500):
+            chunk = clients[start:start + 500]
+            rows = conn.execute(
+                f"SELECT client_id, window, window_index, count FROM rate_limits "
+                f"WHERE client_id IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for client_id, window, index, count in rows:
+                if (client_id, window) in seen:
+                    refreshed.setdefault((client_id, window), {})[index] = count
+        return refreshed
 
 class SecurityLayer:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, token_cache_size=10000):
         self.api_keys = {
             'admin': 'rl_admin_key_2024',
             'monitor': 'rl_monitor_key_2024',
             'readonly': 'rl_readonly_key_2024'
         }
+        # Roles keyed by SHA-256 of the API key: one dict lookup per request,
+        # and its timing depends on the digest rather than on the secret
+        self._roles_by_key_hash = {
+            self._hash(key): role for role, key in self.api_keys.items()
+        }
         
-        self.rate_limits = defaultdict(list)
+        # Verified JWTs, keyed by token hash -> (role, exp), least recently used first
+        self.token_cache_size = token_cache_size
+        self._token_cache = OrderedDict()
+        self._token_cache_lock = threading.Lock()
+        
+        # RATE_LIMIT_DB shares limits across worker processes (e.g. gunicorn)
+        if rate_limiter is None:
+            db_path = os.environ.get('RATE_LIMIT_DB')
+            rate_limiter = SharedRateLimitStore(db_path) if db_path else SlidingWindowRateLimiter()
+        self.rate_limiter = rate_limiter
         self.rate_limit_config = {
             'admin': {'requests': 100, 'window': 60},      # 100 req/min
             'monitor': {'requests': 50, 'window': 60},     # 50 req/min  
@@ -22,32 +252,20 @@ class SecurityLayer:
         
         self.jwt_secret = 'rl_reality_secret_2024'
         
+    @staticmethod
+    def _hash(secret):
+        return hashlib.sha256(secret.encode()).digest()
+    
     def validate_api_key(self, api_key):
-        """Validate API key and return role"""
-        for role, key in self.api_keys.items():
-            if api_key == key:
-                return role
-        return None
+        """Validate API key and return role; None for anything but a non-empty string"""
+        if not isinstance(api_key, str) or not api_key:
+            return None
+        return self._roles_by_key_hash.get(self._hash(api_key))
     
     def check_rate_limit(self, client_id, role='readonly'):
-        """Check if client exceeds rate limit"""
-        current_time = time.time()
+        """Check if client exceeds rate limit; counts the request when it is allowed"""
         config = self.rate_limit_config.get(role, self.rate_limit_config['readonly'])
-        
-        # Clean old requests outside window
-        window_start = current_time - config['window']
-        self.rate_limits[client_id] = [
-            req_time for req_time in self.rate_limits[client_id] 
-            if req_time > window_start
-        ]
-        
-        # Check if limit exceeded
-        if len(self.rate_limits[client_id]) >= config['requests']:
-            return False
-        
-        # Add current request
-        self.rate_limits[client_id].append(current_time)
-        return True
+        return self.rate_limiter.allow(client_id, config['requests'], config['window'])
     
     def generate_jwt_token(self, role, expires_in=3600):
         """Generate JWT token for role"""
@@ -59,14 +277,35 @@ class SecurityLayer:
         return jwt.encode(payload, self.jwt_secret, algorithm='HS256')
     
     def validate_jwt_token(self, token):
-        """Validate JWT token and return role"""
+        """Validate JWT token and return role
+        
+        Tokens that verified once are served from a bounded LRU cache until
+        their exp, so repeat requests skip decoding and the HMAC check.
+        """
+        token_hash = self._hash(token)
+        now = time.time()
+        with self._token_cache_lock:
+            cached = self._token_cache.get(token_hash)
+            if cached is not None:
+                role, expires = cached
+                if expires > now:
+                    self._token_cache.move_to_end(token_hash)
+                    return role
+                del self._token_cache[token_hash]
+        
         try:
             payload = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
-            return payload.get('role')
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        
+        role = payload.get('role')
+        with self._token_cache_lock:
+            self._token_cache[token_hash] = (role, payload.get('exp', float('inf')))
+            if len(self._token_cache) > self.token_cache_size:
+                self._token_cache.popitem(last=False)
+        return role
 
 # Security decorators
 security = SecurityLayer()
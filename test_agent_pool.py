@@ -0,0 +1,30 @@
+import threading
+from agent_pool import ShardedAgentPool
+
+def test_services_learn_independently_and_merge_for_reporting():
+    """Concurrent updates land in per-service Q-tables; the merged view averages them"""
+    pool = ShardedAgentPool(num_shards=4)
+    state = {'severity': 2, 'error_count': 3, 'system_load': 0.8}
+
+    def learn(service, reward):
+        for _ in range(200):
+            pool.update_policy(service, state, 'rollback', reward)
+
+    threads = [threading.Thread(target=learn, args=(f"svc-{i}", -1.0 if i % 2 else 1.0)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    tables = pool.q_tables()
+    assert len(tables) == 8
+    assert tables['svc-0']['2_3_8']['rollback'] > 0.99
+    assert tables['svc-1']['2_3_8']['rollback'] < -0.99
+
+    merged = pool.merged_agent()
+    assert abs(merged.q_table['2_3_8']['rollback']) < 1e-6
+    assert len(merged.policy_history) == 1600
+
+if __name__ == "__main__":
+    test_services_learn_independently_and_merge_for_reporting()
+    print("[OK] Agent pool tests passed")
@@ -0,0 +1,93 @@
+import asyncio
+import socket
+from async_prod_connector import AsyncProductionConnector
+from local_stub_server import StubDomainServer, point_connector_at
+from retry_policy import RetryPolicy
+
+def make_connector(stub, **options):
+    connector = AsyncProductionConnector(retry_policy=RetryPolicy(base_delay=0.01))
+    point_connector_at(connector, 'blackhole', stub)
+    for name, value in options.items():
+        setattr(connector, name, value)
+    return connector
+
+class _Unaccepting:
+    """A listening socket whose accept queue is full, so new connections never complete"""
+
+    def __init__(self):
+        self.server = socket.socket()
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(0)
+        self.url = f"http://127.0.0.1:{self.server.getsockname()[1]}"
+        self.backlog = []
+        for _ in range(2):
+            client = socket.socket()
+            client.setblocking(False)
+            client.connect_ex(self.server.getsockname())
+            self.backlog.append(client)
+
+    def close(self):
+        for sock in self.backlog + [self.server]:
+            sock.close()
+
+def test_commands_and_fan_out_reach_the_stub():
+    async def scenario(stub):
+        async with make_connector(stub) as connector:
+            states = await connector.fan_out('read_app_state', ['blackhole', 'blackhole'])
+            restart = await connector.execute_restart_command('blackhole', 'api')
+            logs = await connector.get_live_logs('blackhole', lines=2)
+        return states, restart, logs
+
+    with StubDomainServer() as stub:
+        states, restart, logs = asyncio.run(scenario(stub))
+
+    assert states['blackhole']['data']['cpu_usage'] == 35
+    assert restart['status'] == 'success' and restart['attempts'] == 1
+    assert restart['response']['received'] == {'service': 'api', 'action': 'restart'}
+    assert logs['logs'] == ['INFO health check ok', 'ERROR upstream timeout']
+
+def test_retries_depend_on_outcome_and_idempotency():
+    """Same policy as the sync connector: 503 retries both commands, 500 only restart"""
+    expected_attempts = {
+        ('deploy', 503): 2, ('restart', 503): 2,
+        ('deploy', 500): 1, ('restart', 500): 2,
+    }
+
+    async def run(connector, command_type):
+        async with connector:
+            if command_type == 'deploy':
+                return await connector.execute_deploy_command('blackhole', {'version': '1.0'})
+            return await connector.execute_restart_command('blackhole', 'api')
+
+    with StubDomainServer() as stub:
+        for (command_type, code), attempts in expected_attempts.items():
+            stub.command_statuses = [code]
+            result = asyncio.run(run(make_connector(stub), command_type))
+            assert result['attempts'] == attempts, (command_type, code, result)
+            assert result['status'] == ('success' if attempts == 2 else 'failed')
+            stub.command_statuses = []
+
+def test_connect_timeouts_are_told_apart_from_read_timeouts():
+    """A connect timeout never reached the domain, so even a deploy retries; a read timeout doesn't"""
+    async def deploy(connector):
+        async with connector:
+            return await connector.execute_deploy_command('blackhole', {'version': '1.0'})
+
+    with StubDomainServer(delay=0.3) as slow:
+        result = asyncio.run(deploy(make_connector(slow, read_timeout=0.1)))
+    assert result['status'] == 'timeout' and result['error'] == 'Domain unresponsive'
+    assert result['attempts'] == 1
+
+    unaccepting = _Unaccepting()
+    try:
+        result = asyncio.run(deploy(make_connector(unaccepting, connect_timeout=0.1)))
+    finally:
+        unaccepting.close()
+    assert result['status'] == 'timeout' and result['error'] == 'Domain unreachable'
+    assert result['attempts'] == 3
+
+if __name__ == "__main__":
+    test_commands_and_fan_out_reach_the_stub()
+    test_retries_depend_on_outcome_and_idempotency()
+    test_connect_timeouts_are_told_apart_from_read_timeouts()
+    print("[OK] Async production connector tests passed")
@@ -0,0 +1,89 @@
+import time
+from auto_failover import AutoFailover, DomainStatus, LatencyWindow
+from domain_registry import DomainRegistry
+from local_stub_server import StubDomainServer
+
+def stub_registry(stubs):
+    return DomainRegistry([
+        {'key': f"d{i}", 'base_url': stub.url, 'health_url': f"{stub.url}/api/v1/status", 'priority': i + 1}
+        for i, stub in enumerate(stubs)
+    ])
+
+def test_health_round_probes_domains_concurrently():
+    """A round takes about one probe however many domains there are, and ranks them in the registry"""
+    with StubDomainServer(delay=0.5) as a, StubDomainServer(delay=0.5) as b, StubDomainServer(delay=0.5) as c:
+        failover = AutoFailover(stub_registry([a, b, c]))
+
+        start = time.time()
+        report = failover.check_all_domains()
+        elapsed = time.time() - start
+
+    assert elapsed < 1.2
+    assert {domain['status'] for domain in report.values()} == {'HEALTHY'}
+    assert failover.last_health_check is not None
+    assert failover.get_best_available_domain() in ('d0', 'd1', 'd2')
+
+def test_failover_status_is_served_from_the_background_checker():
+    """get_failover_status never probes; it reports whatever the last background round found"""
+    with StubDomainServer(delay=0.3) as a, StubDomainServer(delay=0.3) as b:
+        failover = AutoFailover(stub_registry([a, b]))
+        failover.health_check_interval = 60
+
+        start = time.time()
+        first = failover.get_failover_status()
+        assert time.time() - start < 0.2
+        assert first['last_health_check'] is None
+        assert {domain['status'] for domain in first['domains_health'].values()} == {'UNKNOWN'}
+
+        deadline = time.time() + 5
+        while failover.last_health_check is None and time.time() < deadline:
+            time.sleep(0.05)
+        requests_after_round = a.request_count + b.request_count
+
+        for _ in range(5):
+            status = failover.get_failover_status()
+        failover.stop_health_checks()
+
+    assert requests_after_round == 2
+    assert a.request_count + b.request_count == 2
+    assert {domain['status'] for domain in status['domains_health'].values()} == {'HEALTHY'}
+    assert status['last_health_check'] is not None
+
+def test_latency_percentiles_use_nearest_rank_over_a_time_window():
+    window = LatencyWindow(size=100)
+    now = time.time()
+    for value in range(1, 101):
+        window.add(value, timestamp=now - 110 + value)  # One sample a second, 100 ms newest at now - 10
+
+    assert window.percentiles() == {'p50': 50, 'p95': 95, 'p99': 99}
+    # Only the last 19.5 s: 91..100; nearest rank of p50 is the 5th of 10
+    assert window.percentiles(window_seconds=19.5) == {'p50': 95, 'p95': 100, 'p99': 100}
+    assert window.percentile(50, window_seconds=5) is None
+
+    window.add(1000, timestamp=now)  # Ring is full: overwrites the 1 ms sample
+    assert len(window) == 100
+    assert window.values()[:2] == [1000, 100]
+    assert window.percentile(99) == 100 and window.percentile(100) == 1000
+
+def test_slow_tail_degrades_a_domain_and_can_trigger_failover():
+    """A domain answering 200 is DEGRADED once its p95 passes the limit; p99 can force failover"""
+    with StubDomainServer(delay=0.2) as stub:
+        failover = AutoFailover(stub_registry([stub]))
+        failover.health_latency_threshold = 100  # ms
+        assert failover.check_domain_health('d0') == DomainStatus.DEGRADED
+        assert not failover.should_failover()
+
+        failover.health_latency_threshold = 5000
+        assert failover.check_domain_health('d0') == DomainStatus.HEALTHY
+        failover.failover_latency_threshold = 100
+        assert failover.should_failover()
+
+    report = failover.get_health_report()['d0']['latency_percentiles']
+    assert report['5m']['p50'] >= 200 and report['1h']['p99'] >= 200
+
+if __name__ == "__main__":
+    test_health_round_probes_domains_concurrently()
+    test_failover_status_is_served_from_the_background_checker()
+    test_latency_percentiles_use_nearest_rank_over_a_time_window()
+    test_slow_tail_degrades_a_domain_and_can_trigger_failover()
+    print("[OK] Auto failover tests passed")
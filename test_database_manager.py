@@ -0,0 +1,127 @@
+import csv
+import os
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta, timezone
+from database_manager import DatabaseManager, pq
+
+def utc_ago(**delta):
+    return (datetime.now(timezone.utc) - timedelta(**delta)).strftime('%Y-%m-%d %H:%M:%S')
+
+def make_legacy_db(path):
+    """A pre-partitioning database with system metrics spread over several days"""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE system_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            response_time REAL, memory_usage REAL, cpu_usage REAL,
+            error_count INTEGER, service_name TEXT
+        )
+    ''')
+    for age, service in ((dict(days=40), 'old'), (dict(days=3), 'recent'), (dict(minutes=5), 'current')):
+        conn.execute(
+            'INSERT INTO system_metrics (timestamp, response_time, memory_usage, cpu_usage, error_count, service_name) '
+            'VALUES (?, 100, 0.5, 0.5, 0, ?)', (utc_ago(**age), service)
+        )
+    conn.commit()
+    conn.close()
+
+def tables(path):
+    with sqlite3.connect(path) as conn:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def test_legacy_rows_move_into_daily_partitions_with_unique_ids():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rl.db')
+        make_legacy_db(path)
+        db = DatabaseManager(path)
+
+        assert 'system_metrics' not in tables(path)
+        assert len([name for name in tables(path) if name.startswith('system_metrics_p')]) == 3
+
+        # New rows continue the legacy ids instead of restarting in today's partition
+        db.store_system_metrics(120, 0.6, 0.4, 1, 'api')
+        db.store_system_metrics(130, 0.6, 0.4, 0, 'api')
+        export = db.export_to_csv('system_metrics', os.path.join(tmp, 'metrics.csv'))
+        with open(export) as f:
+            rows = list(csv.DictReader(f))
+        assert [row['id'] for row in rows] == ['1', '2', '3', '4', '5']
+        assert [row['service_name'] for row in rows] == ['old', 'recent', 'current', 'api', 'api']
+
+        # A reopened database keeps counting from the stored ids
+        DatabaseManager(path).store_system_metrics(140, 0.6, 0.4, 0, 'api')
+        assert max(row['id'] for row in db.get_system_metrics_history(hours=1)) == 6
+
+def test_range_queries_read_only_matching_days():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rl.db')
+        make_legacy_db(path)
+        db = DatabaseManager(path)
+        db.store_system_metrics(200, 0.6, 0.4, 3, 'api')
+
+        assert [row['service_name'] for row in db.get_system_metrics_history(hours=24)] == ['api', 'current']
+        assert len(db.get_system_metrics_history(hours=24 * 7)) == 3
+        assert db.get_dashboard_summary()['metrics']['total_errors'] == 3
+
+def test_exports_stream_rows_across_chunk_and_partition_boundaries():
+    """Rows come out complete, in id order and with their declared types, whatever the chunk size"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rl.db')
+        make_legacy_db(path)
+        db = DatabaseManager(path)
+        for i in range(8):
+            db.store_system_metrics(100 + i, 0.5, 0.25, i, f"svc{i}")
+        expected_ids = list(range(1, 12))
+        with sqlite3.connect(path) as conn:
+            partition_sizes = [
+                conn.execute(f'SELECT COUNT(*) FROM {name}').fetchone()[0]
+                for name in sorted(tables(path)) if name.startswith('system_metrics_p')
+            ]
+
+        for chunk_size in (1, 4, 5, 5000):
+            export = db.export_to_csv('system_metrics', os.path.join(tmp, f"metrics_{chunk_size}.csv"), chunk_size)
+            with open(export) as f:
+                rows = list(csv.DictReader(f))
+            assert [int(row['id']) for row in rows] == expected_ids, chunk_size
+            assert [float(row['response_time']) for row in rows[3:]] == [100.0 + i for i in range(8)]
+            assert [row['service_name'] for row in rows[-2:]] == ['svc6', 'svc7']
+
+            if pq is None:
+                continue  # Parquet export needs the optional pyarrow
+            export = db.export_to_parquet('system_metrics', os.path.join(tmp, f"metrics_{chunk_size}.parquet"), chunk_size)
+            table = pq.read_table(export)
+            assert pq.ParquetFile(export).num_row_groups == sum(-(-count // chunk_size) for count in partition_sizes)
+            assert table.column('id').to_pylist() == expected_ids
+            assert {str(field.type) for field in table.schema if field.name in ('id', 'error_count')} == {'int64'}
+            assert str(table.schema.field('response_time').type) == 'double'
+            assert table.column('error_count').to_pylist()[3:] == list(range(8))
+
+def test_cleanup_drops_only_partitions_past_retention():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rl.db')
+        make_legacy_db(path)
+        with sqlite3.connect(path) as conn:
+            conn.executemany(
+                'INSERT INTO system_metrics (timestamp, service_name) VALUES (?, ?)',
+                [(utc_ago(days=40), 'x' * 500)] * 2000
+            )
+        db = DatabaseManager(path)
+        size_before = os.path.getsize(path)
+
+        dropped = db.cleanup_old_data(days=30)
+        assert len(dropped) == 1 and dropped[0].startswith('system_metrics_p')
+        assert dropped[0] not in tables(path)
+        # Every page the dropped partition held goes back to the filesystem
+        with sqlite3.connect(path) as conn:
+            assert conn.execute('PRAGMA freelist_count').fetchone()[0] == 0
+        assert os.path.getsize(path) < size_before / 4
+        assert [row['service_name'] for row in db.get_system_metrics_history(hours=24 * 7)] == ['current', 'recent']
+        assert db.cleanup_old_data(days=30) == []
+
+if __name__ == "__main__":
+    test_legacy_rows_move_into_daily_partitions_with_unique_ids()
+    test_range_queries_read_only_matching_days()
+    test_exports_stream_rows_across_chunk_and_partition_boundaries()
+    test_cleanup_drops_only_partitions_past_retention()
+    print("[OK] Database manager tests passed")
@@ -0,0 +1,99 @@
+from auto_failover import AutoFailover, DomainStatus
+from domain_registry import DomainRegistry
+from prod_connector import ProductionConnector
+
+def make_registry(count=3):
+    return DomainRegistry([
+        {'key': f"d{i}", 'base_url': f"https://d{i}.example/", 'priority': i + 1} for i in range(count)
+    ])
+
+def test_best_domain_follows_the_latest_rank():
+    """Superseded and unavailable heap entries are skipped lazily"""
+    registry = make_registry()
+    registry.update_health('d0', 5)
+    registry.update_health('d1', 3)
+    registry.update_health('d2', 4)
+    assert registry.best_domain() == 'd1'
+
+    registry.update_health('d1', 9)  # Old rank 3 entry stays in the heap until it surfaces
+    assert registry.best_domain() == 'd2'
+    registry.mark_unavailable('d2')
+    assert registry.best_domain() == 'd0'
+    registry.update_health('unknown', 0)
+    assert registry.best_domain() == 'd0'
+
+    registry.mark_unavailable('d0')
+    registry.mark_unavailable('d1')
+    assert registry.best_domain() is None
+
+def test_heap_is_compacted_when_stale_entries_pile_up():
+    registry = make_registry()
+    for rank in range(1000):
+        registry.update_health(f"d{rank % 3}", rank)
+    assert len(registry._heap) <= 2 * 3 + 16
+    assert registry.best_domain() == 'd1'  # Ranks 997, 998, 999 -> d1 holds 997
+
+def test_register_and_unregister_reach_connectors_and_heap():
+    """Connectors read through the registry, so runtime changes apply without a restart"""
+    registry = make_registry(2)
+    connector = ProductionConnector(registry=registry)
+    registry.update_health('d1', 1)
+
+    registry.register('d9', {'base_url': 'https://d9.example', 'api_key': 'k9'})
+    assert connector.domains['d9']['base_url'] == 'https://d9.example'
+    assert registry.domains['d9']['priority'] == 3
+    assert connector.domains is registry.connector_domains()  # Cached until the next change
+
+    registry.unregister('d1')
+    assert 'd1' not in connector.domains
+    assert registry.best_domain() is None
+    registry.update_health('d1', 0)  # Ignored for unregistered domains
+    assert registry.best_domain() is None
+
+def test_failover_leaves_an_unregistered_active_domain():
+    registry = make_registry()
+    failover = AutoFailover(registry)
+    assert failover.active_domain == 'd0'
+    with failover._lock:
+        failover.domains['d2']['status'] = DomainStatus.HEALTHY
+        failover._update_rank('d2')
+
+    registry.unregister('d0')
+    assert failover.should_failover()
+    assert failover.execute_failover()['new_domain'] == 'd2'
+
+    registry.unregister('d2')
+    assert failover.execute_failover()['new_domain'] == 'd1'  # Nothing healthy left: the primary
+    failover.sync_domains()
+    assert set(failover.domains) == {'d1'}
+    assert not failover.should_failover()
+
+    registry.register('d3', {'base_url': 'https://d3.example'})
+    registry.unregister('d1')
+    failover.sync_domains()  # A probe round syncs before anyone asks should_failover
+    assert failover.active_domain == 'd3'
+
+def test_sync_picks_up_a_re_registered_url_and_priority():
+    """Moving a domain to a new host keeps its health history"""
+    registry = make_registry(2)
+    failover = AutoFailover(registry)
+    with failover._lock:
+        failover.domains['d1']['status'] = DomainStatus.HEALTHY
+        failover.domains['d1']['latency'].add(42)
+    latency = failover.domains['d1']['latency']
+
+    registry.register('d1', {'base_url': 'https://d1-new.example', 'health_url': 'https://d1-new.example/health',
+                             'priority': 7})
+    failover.sync_domains()
+    d1 = failover.domains['d1']
+    assert d1['url'] == 'https://d1-new.example/health' and d1['priority'] == 7
+    assert d1['status'] == DomainStatus.HEALTHY and d1['latency'] is latency and latency.values() == [42]
+    assert failover.domains['d0']['url'] == 'https://d0.example/'
+
+if __name__ == "__main__":
+    test_best_domain_follows_the_latest_rank()
+    test_heap_is_compacted_when_stale_entries_pile_up()
+    test_register_and_unregister_reach_connectors_and_heap()
+    test_failover_leaves_an_unregistered_active_domain()
+    test_sync_picks_up_a_re_registered_url_and_priority()
+    print("[OK] Domain registry tests passed")
@@ -0,0 +1,144 @@
+import os
+import tempfile
+import time
+from datetime import datetime
+from local_stub_server import StubDomainServer, point_connector_at
+from prod_connector import ProductionConnector
+from real_feedback_collector import RealFeedbackCollector
+
+def test_collect_many_fetches_domains_concurrently():
+    """collect_many latency should track the slowest domain, not the sum"""
+    collector = RealFeedbackCollector()
+
+    with StubDomainServer(delay=0.5) as blackhole, StubDomainServer(delay=0.5) as uni_guru:
+        point_connector_at(collector.prod_connector, 'blackhole', blackhole)
+        point_connector_at(collector.prod_connector, 'uni_guru', uni_guru)
+
+        start = time.time()
+        results = collector.collect_many(['blackhole', 'uni_guru'], datetime.now().isoformat())
+        elapsed = time.time() - start
+
+    # Sequential collection would take 4 x 0.5s
+    assert elapsed < 1.5
+    for domain in ('blackhole', 'uni_guru'):
+        assert results[domain]['domain'] == domain
+        assert results[domain]['metrics']['error_count'] == 1
+        assert results[domain]['metrics']['success_count'] == 2
+    assert len(collector.feedback_history) == 2
+
+def test_collect_many_enforces_per_domain_deadline():
+    """A slow domain times out without delaying the fast one"""
+    collector = RealFeedbackCollector()
+
+    with StubDomainServer(delay=0) as fast, StubDomainServer(delay=3) as slow:
+        point_connector_at(collector.prod_connector, 'blackhole', fast)
+        point_connector_at(collector.prod_connector, 'uni_guru', slow)
+
+        start = time.time()
+        results = collector.collect_many(
+            ['blackhole', 'uni_guru'], deadline=5, deadlines={'uni_guru': 0.5}
+        )
+        elapsed = time.time() - start
+
+    assert elapsed < 2
+    assert 'health_score' in results['blackhole']
+    assert results['uni_guru']['status'] == 'timeout'
+
+def test_collection_only_analyzes_new_log_entries():
+    """Overlapping log lines from the previous poll are not counted again"""
+    collector = RealFeedbackCollector()
+
+    with StubDomainServer() as stub:
+        point_connector_at(collector.prod_connector, 'blackhole', stub)
+
+        first = collector.collect_domain_feedback('blackhole', datetime.now().isoformat())
+        stub.logs.append('ERROR disk full')
+        second = collector.collect_domain_feedback('blackhole', datetime.now().isoformat())
+
+    assert first['metrics']['error_count'] == 1
+    assert first['metrics']['success_count'] == 2
+    assert second['metrics']['error_count'] == 1
+    assert second['metrics']['success_count'] == 0
+
+def test_tail_counts_repeated_lines_once_each():
+    """Identical lines after the previous window are new, not an overlap"""
+    connector = ProductionConnector()
+
+    with StubDomainServer(logs=['INFO health check ok'] * 3) as stub:
+        point_connector_at(connector, 'blackhole', stub)
+        assert len(connector.tail_logs('blackhole', lines=50)['logs']) == 3
+        stub.logs.append('INFO health check ok')
+        assert len(connector.tail_logs('blackhole', lines=50)['logs']) == 1
+        stub.logs.extend(['INFO health check ok'] * 2)
+        assert len(connector.tail_logs('blackhole', lines=50)['logs']) == 2
+
+        # Once the log outgrows the window, the overlap is found by fingerprints
+        stub.logs.extend(['ERROR disk full', 'INFO health check ok'])
+        assert connector.tail_logs('blackhole', lines=5)['logs'] == ['ERROR disk full', 'INFO health check ok']
+        stub.logs.append('ERROR disk full')
+        assert connector.tail_logs('blackhole', lines=5)['logs'] == ['ERROR disk full']
+
+def test_tail_resumes_from_checkpoint_and_server_cursor():
+    """A restarted connector resumes from its checkpoint; cursor servers are asked for new entries only"""
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, 'tail.json')
+        with StubDomainServer() as plain, StubDomainServer(supports_cursor=True) as cursored:
+            first = ProductionConnector(log_checkpoint_path=checkpoint)
+            point_connector_at(first, 'blackhole', plain)
+            point_connector_at(first, 'uni_guru', cursored)
+            assert len(first.tail_logs('blackhole')['logs']) == 3
+            assert first.tail_logs('uni_guru')['cursor'] == 3
+
+            plain.logs.append('ERROR disk full')
+            restarted = ProductionConnector(log_checkpoint_path=checkpoint)
+            point_connector_at(restarted, 'blackhole', plain)
+            point_connector_at(restarted, 'uni_guru', cursored)
+            assert restarted.tail_logs('blackhole')['logs'] == ['ERROR disk full']
+            assert restarted.tail_logs('uni_guru')['logs'] == []
+            cursored.logs.append('ERROR upstream timeout')  # Same line as in the old window
+            tail = restarted.tail_logs('uni_guru')
+            assert tail['logs'] == ['ERROR upstream timeout'] and tail['cursor'] == 4
+
+def test_timed_out_tail_does_not_move_the_log_position():
+    """Entries fetched by a call that missed its deadline are read again next time"""
+    collector = RealFeedbackCollector()
+
+    with StubDomainServer(delay=0.5) as stub:
+        point_connector_at(collector.prod_connector, 'blackhole', stub)
+        results = collector.collect_many(['blackhole'], deadlines={'blackhole': 0.1})
+        assert results['blackhole']['status'] == 'timeout'
+        time.sleep(1.2)  # Let the abandoned calls finish
+
+        stub.delay = 0
+        retry = collector.collect_many(['blackhole'])
+
+    assert retry['blackhole']['metrics']['error_count'] == 1
+    assert retry['blackhole']['metrics']['success_count'] == 2
+
+def test_rewards_are_indexed_by_time_and_expire_after_retention():
+    """Recent-reward queries merge domains in time order; entries past retention are dropped"""
+    collector = RealFeedbackCollector(reward_retention_hours=1)
+    now = time.time()
+    for domain, age in (('blackhole', 7200), ('blackhole', 1800), ('uni_guru', 600),
+                        ('blackhole', 60), ('uni_guru', 3000)):  # The last one arrives out of order
+        collector._store_reward({'domain': domain, 'age': age}, now - age)
+
+    assert [entry['age'] for entry in collector.reward_memory] == [3000, 1800, 600, 60]
+    assert [entry['age'] for entry in collector.get_recent_rewards(hours=0.5)] == [600, 60]
+    assert [entry['age'] for entry in collector.get_recent_rewards('uni_guru')] == [3000, 600]
+    assert collector.get_recent_rewards('unknown') == []
+
+    # Expiry happens on read as well as on insert
+    collector.reward_retention_hours = 0.25
+    assert [entry['age'] for entry in collector.get_recent_rewards()] == [600, 60]
+    assert len(collector.reward_memory) == 2
+
+if __name__ == "__main__":
+    test_collect_many_fetches_domains_concurrently()
+    test_collect_many_enforces_per_domain_deadline()
+    test_collection_only_analyzes_new_log_entries()
+    test_tail_counts_repeated_lines_once_each()
+    test_tail_resumes_from_checkpoint_and_server_cursor()
+    test_timed_out_tail_does_not_move_the_log_position()
+    test_rewards_are_indexed_by_time_and_expire_after_retention()
+    print("[OK] Feedback collection tests passed")
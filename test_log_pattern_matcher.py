@@ -0,0 +1,30 @@
+from log_pattern_matcher import MultiPatternMatcher
+from real_feedback_collector import LOG_KEYWORDS
+
+def test_error_keywords_outrank_success_in_the_same_entry():
+    """An entry is labelled by its highest-priority category, wherever the keywords occur"""
+    matcher = MultiPatternMatcher(LOG_KEYWORDS)
+    assert matcher.classify([
+        'INFO health check ok',
+        'Deploy completed, then FAILED on verify',
+        'Error after ok',
+        'ok ok ok error',
+        'DEBUG cache warm',
+        '',
+    ]) == ['success', 'error', 'error', 'error', None, None]
+
+def test_keywords_never_match_across_entries():
+    """The separator between entries resets matching, and newlines inside an entry can't join words"""
+    matcher = MultiPatternMatcher(LOG_KEYWORDS)
+    assert matcher.classify(['request fai', 'led over', 'time\nout', 'succ', 'ess']) == [None] * 5
+
+def test_settled_entries_do_not_disturb_the_next_ones():
+    """Skipping the rest of an entry after an error still labels every later entry"""
+    matcher = MultiPatternMatcher({'error': ['err'], 'warning': ['warn', 'rror'], 'success': ['ok']})
+    assert matcher.classify(['error warn ok', 'warn ok', 'ok', 'rror']) == ['error', 'warning', 'success', 'warning']
+
+if __name__ == "__main__":
+    test_error_keywords_outrank_success_in_the_same_entry()
+    test_keywords_never_match_across_entries()
+    test_settled_entries_do_not_disturb_the_next_ones()
+    print("[OK] Log pattern matcher tests passed")
@@ -0,0 +1,145 @@
+import json
+import threading
+from core.event_mapping import EventMapper
+from core.mcp_bridge import MCPBridge, integrate_rl_system
+from core.sovereign_bus import bus
+
+def test_batch_inbox_acks_each_event_and_publishes_valid_ones():
+    """Valid events are published in order; malformed ones are rejected individually"""
+    bridge = MCPBridge()
+    client = bridge.app.test_client()
+    start = bus.latest_seq
+
+    lines = [
+        json.dumps({'event_type': 'deploy.success', 'data': {'service': 'api', 'version': '1.2'}}),
+        json.dumps({'event_type': 'deploy.failed', 'data': {'service': 'api'}}),
+        '{not json',
+        json.dumps({'event_type': 'uptime.check', 'data': {'service': 'api', 'status': 'up', 'response_time': 12}}),
+    ]
+    response = client.post('/mcp_inbox/batch', data='\n'.join(lines),
+                           content_type='application/x-ndjson')
+    bridge.flush_inbox()
+
+    assert response.status_code == 202
+    assert [ack['status'] for ack in response.json['acks']] == ['accepted', 'rejected', 'rejected', 'accepted']
+    assert 'error' in response.json['acks'][1]
+    published = bus.get_messages_since(start)
+    assert [m['event_type'] for m in published] == ['deploy.success', 'uptime.check']
+
+    response = client.post('/mcp_inbox/batch', json=[{'event_type': 'mcp.ping', 'data': {}}])
+    assert response.json['accepted'] == 1
+
+def test_inbox_rejects_bad_event_types_and_survives_bus_failures():
+    """Non-string event types get their own ack, and a failing bus doesn't stop the publisher"""
+    bridge = MCPBridge()
+    client = bridge.app.test_client()
+
+    response = client.post('/mcp_inbox/batch', json=[
+        {'event_type': 123, 'data': {}},
+        {'event_type': '', 'data': {}},
+        {'event_type': 'mcp.ping', 'data': {}},
+    ])
+    assert [ack['status'] for ack in response.json['acks']] == ['rejected', 'rejected', 'accepted']
+    assert 'event_type' in response.json['acks'][0]['error']
+    assert client.post('/mcp_inbox', json={'event_type': 123}).status_code == 400
+
+    def unavailable(*args):
+        raise OSError("event log unavailable")
+
+    bus.publish_many = bus.publish = unavailable  # Instance attributes shadow the methods
+    try:
+        client.post('/mcp_inbox/batch', json=[{'event_type': 'mcp.ping', 'data': {}}])
+        bridge.flush_inbox()
+    finally:
+        del bus.publish_many, bus.publish
+
+    start = bus.latest_seq
+    assert client.post('/mcp_inbox/batch', json=[{'event_type': 'mcp.ping', 'data': {}}]).status_code == 202
+    bridge.flush_inbox()
+    assert [m['event_type'] for m in bus.get_messages_since(start)] == ['mcp.ping']
+
+def test_outbox_long_poll_resumes_from_cursor():
+    """A long poll returns the next matching message, and the cursor skips non-matching ones"""
+    client = MCPBridge().app.test_client()
+    cursor = bus.latest_seq
+
+    publisher = threading.Timer(0.2, lambda: bus.publish_many([('uptime.noise', {}), ('rl.report_generated', {})]))
+    publisher.start()
+    first = client.get(f'/mcp_outbox?since={cursor}&wait=5&topics=rl.%23').json
+    publisher.join()
+
+    assert [m['event_type'] for m in first['messages']] == ['rl.report_generated']
+    assert first['next_cursor'] == cursor + 2
+
+    second = client.get(f"/mcp_outbox?since={first['next_cursor']}&wait=0.1").json
+    assert second['messages'] == []
+    assert second['next_cursor'] == first['next_cursor']
+
+def test_event_mapper_extracts_state_and_reward_from_payloads():
+    """Mappings apply in listed order, read payload fields and skip unmappable events"""
+    mapper = EventMapper([
+        {'event': 'issue.detected',
+         'state': {'severity': {'field': 'severity', 'map': {'low': 0, 'high': 2}},
+                   'error_count': {'field': 'stats.errors', 'default': 1},
+                   'system_load': {'field': 'load', 'scale': 0.01, 'clip': [0, 1], 'default': 0.5}},
+         'reward': {'field': 'severity', 'map': {'low': -0.2, 'high': -1.0}}},
+        {'event': 'issue.#', 'state': {'severity': 1, 'error_count': 1, 'system_load': 0.5}, 'reward': -0.1},
+    ])
+
+    transitions = mapper.map_batch([
+        {'event_type': 'issue.detected', 'data': {'severity': 'high', 'stats': {'errors': 7}, 'load': 250}},
+        {'event_type': 'issue.detected', 'data': {'severity': 'unknown'}},
+        {'event_type': 'issue.resolved', 'data': {}},
+        {'event_type': 'deploy.success', 'data': {}},
+    ])
+
+    assert [(state, reward) for _, state, reward in transitions] == [
+        ({'severity': 2, 'error_count': 7, 'system_load': 1}, -1.0),
+        ({'severity': 1, 'error_count': 1, 'system_load': 0.5}, -0.1),
+    ]
+
+def test_map_batch_skips_malformed_messages():
+    """One bad message is reported on its own; the rest of the batch still maps"""
+    mapper = EventMapper([{'event': 'deploy.*', 'state': {'severity': 0, 'error_count': 0, 'system_load': 0.2},
+                           'reward': {'field': 'reward', 'default': 1.0}}])
+    errors = []
+    transitions = mapper.map_batch([
+        {'event_type': 'deploy.success', 'data': {}},
+        {'data': {'reward': 5}},
+        {'event_type': 'deploy.failed', 'data': ['not', 'an', 'object']},
+        {'event_type': 'deploy.success', 'data': {'reward': 0.5}},
+    ], errors)
+
+    assert [reward for _, _, reward in transitions] == [1.0, 1.0, 0.5]
+    assert len(errors) == 1 and isinstance(errors[0][1], KeyError)
+
+def test_rl_system_learns_from_the_valid_events_in_a_batch():
+    """Events with a non-string service or non-object data still learn, under the default service"""
+    agent_pool = integrate_rl_system(event_log_dir=None, bus_socket=None)
+    start = bus.latest_seq
+
+    bus.publish_many(
+        [('deploy.success', {'service': 'api', 'version': f'1.{i}'}) for i in range(5)]
+        + [('issue.detected', {'severity': 'high', 'message': 'disk full', 'service': 7}),
+           ('deploy.failed', ['not', 'an', 'object'])]
+    )
+    assert bus.wait_idle(5)
+
+    published = bus.get_messages_since(start)
+    updates = [m['data'] for m in published if m['event_type'] == 'rl.policy_updated']
+    # Shards learn side by side, so only each service's own updates are ordered
+    assert sorted(update['service'] for update in updates) == ['api'] * 5 + ['global'] * 2
+    assert [update['learned_from'] for update in updates if update['service'] == 'global'] == [
+        'issue.detected', 'deploy.failed'
+    ]
+    assert not [m for m in published if m['event_type'] == 'rl.error']
+    assert set(agent_pool.q_tables()) == {'api', 'global'}
+
+if __name__ == "__main__":
+    test_batch_inbox_acks_each_event_and_publishes_valid_ones()
+    test_inbox_rejects_bad_event_types_and_survives_bus_failures()
+    test_outbox_long_poll_resumes_from_cursor()
+    test_event_mapper_extracts_state_and_reward_from_payloads()
+    test_map_batch_skips_malformed_messages()
+    test_rl_system_learns_from_the_valid_events_in_a_batch()
+    print("[OK] MCP bridge tests passed")
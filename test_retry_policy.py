@@ -0,0 +1,68 @@
+import threading
+import time
+from local_stub_server import StubDomainServer, point_connector_at
+from prod_connector import ProductionConnector
+from retry_policy import RetryPolicy
+
+def make_connector(stub, **policy):
+    connector = ProductionConnector(retry_policy=RetryPolicy(base_delay=0.01, **policy))
+    point_connector_at(connector, 'blackhole', stub)
+    return connector
+
+def run(connector, command_type):
+    if command_type == 'deploy':
+        return connector.execute_deploy_command('blackhole', {'version': '1.0'})
+    return connector.execute_restart_command('blackhole', 'api')
+
+def test_retries_depend_on_outcome_and_idempotency():
+    """503 never reached the domain, so both commands retry; 500 and timeouts retry only restart"""
+    expected_attempts = {
+        ('deploy', 503): 2, ('restart', 503): 2,
+        ('deploy', 500): 1, ('restart', 500): 2,
+    }
+    with StubDomainServer() as stub:
+        for (command_type, code), attempts in expected_attempts.items():
+            connector = make_connector(stub)
+            stub.command_statuses = [code]
+            result = run(connector, command_type)
+            assert result['attempts'] == attempts, (command_type, code, result)
+            assert result['status'] == ('success' if attempts == 2 else 'failed')
+            stub.command_statuses = []
+
+    with StubDomainServer(delay=0.3) as slow:
+        for command_type, attempts in (('deploy', 1), ('restart', 3)):
+            connector = make_connector(slow)
+            connector.read_timeout = 0.1
+            result = run(connector, command_type)
+            assert result['status'] == 'timeout' and result['attempts'] == attempts
+
+def test_retry_budget_stops_retries_once_spent():
+    with StubDomainServer() as stub:
+        connector = make_connector(stub, budget_cap=1, budget_ratio=0)
+        stub.command_statuses = [503] * 4
+
+        assert run(connector, 'restart')['attempts'] == 2  # Spends the only token
+        assert run(connector, 'restart')['attempts'] == 1
+        assert connector.retry_policy.remaining_budget('blackhole') == 0
+
+def test_concurrent_commands_do_not_share_the_scheduler_pool():
+    """First attempts run on the callers' threads, so 16 concurrent restarts take one round trip"""
+    with StubDomainServer(delay=0.5) as stub:
+        connector = make_connector(stub)
+        threads = [threading.Thread(target=run, args=(connector, 'restart')) for _ in range(16)]
+
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+    assert elapsed < 0.9
+    assert stub.request_count == 16
+
+if __name__ == "__main__":
+    test_retries_depend_on_outcome_and_idempotency()
+    test_retry_budget_stops_retries_once_spent()
+    test_concurrent_commands_do_not_share_the_scheduler_pool()
+    print("[OK] Retry policy tests passed")
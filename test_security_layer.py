@@ -0,0 +1,103 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import jwt
+from security_layer import SecurityLayer, SharedRateLimitStore, SlidingWindowRateLimiter
+
+def test_sliding_window_limits_and_evicts_idle_clients():
+    """The previous window counts in proportion to its overlap, and idle clients are dropped"""
+    limiter = SlidingWindowRateLimiter(max_clients=1000, stripes=1)
+
+    assert sum(limiter.allow('dash', 10, 60, now=60 + i) for i in range(15)) == 10
+    # Halfway through the next window, half of the previous 10 still count
+    assert sum(limiter.allow('dash', 10, 60, now=150) for _ in range(10)) == 5
+
+    for i in range(200):
+        limiter.allow(f"idle-{i}", 10, 60, now=200)
+    assert len(limiter) == 201
+    limiter.allow('late', 10, 60, now=400)
+    assert len(limiter) == 1
+
+def test_concurrent_checks_never_exceed_the_limit():
+    limiter = SlidingWindowRateLimiter()
+    allowed = []
+
+    def hammer():
+        allowed.append(sum(limiter.allow('shared', 100, 60, now=30) for _ in range(100)))
+
+    threads = [threading.Thread(target=hammer) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(allowed) == 100
+
+def _worker_requests(store, requests, results):
+    results.put(sum(store.allow('10.0.0.1_monitor', 100, 60, now=6030) for _ in range(requests)))
+
+def test_shared_store_enforces_one_limit_across_worker_processes():
+    """Four forked workers sharing one SQLite store admit about one limit's worth, not four"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SharedRateLimitStore(os.path.join(tmp, 'limits.db'), batch_size=5)
+        store.allow('warmup', 1, 60)  # Connection opened pre-fork, as under gunicorn --preload
+
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [context.Process(target=_worker_requests, args=(store, 80, results)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        admitted = sum(results.get(timeout=30) for _ in workers)
+        for worker in workers:
+            worker.join()
+
+        # Each worker may run ahead of the others by at most one unsynced batch
+        assert 100 <= admitted <= 100 + 4 * store.batch_size
+        fresh = SharedRateLimitStore(os.path.join(tmp, 'limits.db'))
+        assert not fresh.allow('10.0.0.1_monitor', 100, 60, now=6031)
+
+def test_verified_tokens_are_cached_until_exp():
+    """Repeat tokens skip verification until they expire; bad tokens are never cached"""
+    security = SecurityLayer(token_cache_size=2)
+    token = security.generate_jwt_token('monitor')
+    assert security.validate_jwt_token(token) == 'monitor'
+    assert security.validate_jwt_token(token) == 'monitor'
+    assert len(security._token_cache) == 1
+
+    assert security.validate_jwt_token('garbage') is None
+    assert security.validate_jwt_token(token[:-2] + 'xx') is None
+    assert len(security._token_cache) == 1
+
+    expiring = jwt.encode({'role': 'admin', 'exp': time.time() + 1}, security.jwt_secret, algorithm='HS256')
+    assert security.validate_jwt_token(expiring) == 'admin'
+    time.sleep(1.1)
+    assert security.validate_jwt_token(expiring) is None
+
+    for role in ('admin', 'monitor', 'readonly'):
+        security.validate_jwt_token(security.generate_jwt_token(role, expires_in=7200))
+    assert len(security._token_cache) == 2
+
+    assert security.validate_api_key('rl_admin_key_2024') == 'admin'
+    assert security.validate_api_key('rl_admin_key_2025') is None
+
+def test_token_endpoint_rejects_missing_and_non_string_keys():
+    """Malformed requests are a 401 like any other bad key, never a 500"""
+    from dashboard import app
+    client = app.test_client()
+    for body in ({}, {'api_key': 123}, {'api_key': ''}, {'api_key': None}, ['rl_admin_key_2024']):
+        response = client.post('/api/auth/token', json=body)
+        assert response.status_code == 401, (body, response.get_json())
+    assert client.post('/api/auth/token', data='api_key=x').status_code == 401
+    assert client.post('/api/auth/token', json={'api_key': 'rl_admin_key_2024'}).get_json()['role'] == 'admin'
+
+    security = SecurityLayer()
+    assert all(security.validate_api_key(key) is None for key in (None, 123, b'rl_admin_key_2024', ''))
+
+if __name__ == "__main__":
+    test_sliding_window_limits_and_evicts_idle_clients()
+    test_concurrent_checks_never_exceed_the_limit()
+    test_shared_store_enforces_one_limit_across_worker_processes()
+    test_verified_tokens_are_cached_until_exp()
+    test_token_endpoint_rejects_missing_and_non_string_keys()
+    print("[OK] Security layer tests passed")
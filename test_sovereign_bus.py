@@ -0,0 +1,195 @@
+import os
+import tempfile
+import threading
+import time
+from core.bus_transport import BusTransport
+from core.event_log import EventLog
+from core.sovereign_bus import EventValidationError, SovereignMessageBus, validate_event
+
+def test_history_is_bounded_and_indexed_by_type():
+    """Sequence ids stay unique within a second and old messages age out of the ring"""
+    bus = SovereignMessageBus(history_size=5)
+    for i in range(12):
+        bus.publish(['rl.action', 'deploy.done'][i % 2], {'i': i})
+
+    assert bus.latest_seq == 12
+    assert [m['seq'] for m in bus.message_history] == [8, 9, 10, 11, 12]
+    assert len({m['id'] for m in bus.message_history}) == 5
+    assert [m['data']['i'] for m in bus.get_recent_messages(2, 'rl.action')] == [8, 10]
+    assert [m['seq'] for m in bus.get_messages_since(10)] == [11, 12]
+    assert [m['seq'] for m in bus.get_messages_since(0, 'deploy.done')] == [8, 10, 12]
+
+def test_wildcard_subscriptions_deliver_once_per_callback():
+    """'*' matches one segment, '#' any number, and overlapping patterns don't duplicate"""
+    bus = SovereignMessageBus()
+    deploys, rl_events = [], []
+    bus.subscribe('deploy.*', deploys.append)
+    bus.subscribe('deploy.failed', deploys.append)
+    bus.subscribe('rl.#', rl_events.append)
+
+    for event_type in ('deploy.failed', 'deploy.canary.failed', 'rl', 'rl.policy.updated', 'heal.triggered'):
+        bus.publish(event_type, {})
+
+    assert [m['event_type'] for m in deploys] == ['deploy.failed']
+    assert [m['event_type'] for m in rl_events] == ['rl', 'rl.policy.updated']
+
+def test_event_log_survives_restart_and_torn_tail():
+    """A reopened log drops a half-written record and continues the sequence"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = SovereignMessageBus(event_log=EventLog(tmp, segment_bytes=1024, index_interval=4))
+        for i in range(50):
+            bus.publish('deploy.success' if i % 5 else 'deploy.failed', {'i': i})
+        bus.event_log.close()
+
+        newest = max(name for name in os.listdir(tmp) if name.endswith('.log'))
+        with open(os.path.join(tmp, newest), 'ab') as f:
+            f.write(b'\x40\x00\x00\x00torn')
+
+        restarted = SovereignMessageBus(event_log=EventLog(tmp, segment_bytes=1024, index_interval=4))
+        restarted.publish('deploy.failed', {'i': 50})
+
+        assert len(os.listdir(tmp)) > 2  # Rolled over several segments
+        assert [m['seq'] for m in restarted.replay(48)] == [48, 49, 50, 51]
+        assert [m['data']['i'] for m in restarted.replay(40, 'deploy.failed')] == [40, 45, 50]
+        restarted.event_log.close()
+
+def test_transport_connects_buses_over_unix_socket():
+    """A message published on one bus reaches the other once and is not echoed back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bus.sock')
+        first, second = SovereignMessageBus(), SovereignMessageBus()
+        first.attach_transport(BusTransport(path))
+        second.attach_transport(BusTransport(path))
+        received = []
+        second.subscribe('deploy.*', received.append)
+
+        first.publish('deploy.success', {'service': 'api', 'version': '1.0'})
+        deadline = time.time() + 5
+        while not received and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert [m['data']['service'] for m in received] == ['api']
+        assert received[0]['origin'] == os.getpid()
+        assert [m['event_type'] for m in first.message_history] == ['deploy.success']
+        second.transport.close()
+        first.transport.close()
+
+def test_strict_validation_rejects_the_whole_batch():
+    """A schema violation in strict mode publishes nothing from the batch"""
+    bus = SovereignMessageBus(validation='strict')
+    valid = ('deploy.success', {'service': 'api', 'version': '1.0'})
+
+    try:
+        bus.publish_many([valid, ('rl.policy_updated', {'drift_score': 'high', 'reward': 1.0})])
+        assert False, "expected EventValidationError"
+    except EventValidationError as e:
+        assert 'drift_score' in str(e)
+
+    assert bus.latest_seq == 0
+    assert bus.publish_many([valid, ('rl.policy_updated', {'drift_score': 0.4, 'reward': -2})]) == [1, 2]
+    assert 'event_type' in validate_event(7, {'service': 'api', 'version': '1.0'})
+    assert 'event_type' in validate_event('', {})
+
+def test_async_backpressure_policies_on_a_full_queue():
+    """With the worker held on the first message, a 2-slot queue drops, evicts or blocks the rest"""
+    delivered_by_policy = {'drop_newest': [0, 1, 2], 'drop_oldest': [0, 4, 5], 'block': [0, 1, 2, 3, 4, 5]}
+    for policy, expected in delivered_by_policy.items():
+        bus = SovereignMessageBus()
+        started, release, received = threading.Event(), threading.Event(), []
+
+        def slow_consumer(message):
+            started.set()
+            release.wait(5)
+            received.append(message['data']['i'])
+
+        bus.subscribe('rl.tick', slow_consumer, mode='async', queue_size=2, backpressure=policy)
+        bus.publish('rl.tick', {'i': 0})
+        assert started.wait(5)
+
+        publisher = threading.Thread(target=lambda: [bus.publish('rl.tick', {'i': i}) for i in range(1, 6)])
+        publisher.start()
+        time.sleep(0.2)
+        assert publisher.is_alive() == (policy == 'block'), policy
+        assert not bus.wait_idle(timeout=0.05)
+
+        release.set()
+        publisher.join(5)
+        assert bus.wait_idle(timeout=5)
+        assert received == expected, policy
+
+        metrics = bus.subscribers[slow_consumer].metrics()
+        assert metrics['delivered'] == len(expected) and metrics['queue_depth'] == 0
+        assert metrics['dropped'] == 6 - len(expected)
+        assert metrics['max_lag_ms'] >= 200  # Queued while the first message was held
+
+def test_partitioned_subscriber_keeps_key_order_and_isolates_partitions():
+    """A held partition doesn't stop the others; each key is handled in order by one worker"""
+    bus = SovereignMessageBus()
+    release, received = threading.Event(), []
+
+    def consume(message):
+        key = message['data']['key']
+        if key == 0:
+            release.wait(5)
+        received.append((key, message['data']['i'], threading.current_thread().name))
+
+    try:
+        bus.subscribe('rl.tick', consume, partitions=2, partition_key=lambda m: m['data']['key'])
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    bus.subscribe('rl.tick', consume, mode='async', partitions=2, partition_key=lambda m: m['data']['key'])
+
+    bus.publish_many([('rl.tick', {'key': i % 2, 'i': i}) for i in range(6)])
+    assert not bus.wait_idle(timeout=0.2)
+    assert [i for key, i, _ in received] == [1, 3, 5]  # Key 1 done while key 0 is held
+
+    release.set()
+    assert bus.wait_idle(timeout=5)
+    assert [i for key, i, _ in received if key == 0] == [0, 2, 4]
+    assert len({thread for _, _, thread in received}) == 2
+
+    metrics = bus.get_subscriber_metrics()[0]
+    assert metrics['partitions'] == 2 and metrics['delivered'] == 6 and metrics['queue_depth'] == 0
+
+def test_failed_publish_leaves_bus_and_log_usable():
+    """A rejected or unserializable batch leaves no trace in history, the log, the seqs or subscribers"""
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = SovereignMessageBus(event_log=EventLog(tmp))
+        try:
+            bus.publish(123, {'service': 'api'})
+            assert False, "expected EventValidationError"
+        except EventValidationError:
+            pass
+        assert bus.latest_seq == 0 and bus.message_history == []
+
+        received = []
+        bus.subscribe('deploy.*', received.append)
+        try:
+            # The good event ahead of the unserializable one mustn't be kept either
+            bus.publish_many([
+                ('deploy.success', {'service': 'api', 'version': '0.9'}),
+                ('deploy.note', {'handle': object()}),
+            ])
+            assert False, "expected TypeError"
+        except TypeError:
+            pass
+        assert bus.latest_seq == 0 and bus.message_history == []
+        assert list(bus.replay()) == [] and received == []
+
+        assert bus.publish('deploy.success', {'service': 'api', 'version': '1.0'}) == 1
+        assert [m['seq'] for m in bus.replay()] == [1]
+        assert [m['data']['version'] for m in received] == ['1.0']
+        assert [m['event_type'] for m in bus.get_recent_messages(5)] == ['deploy.success']
+        bus.event_log.close()
+
+if __name__ == "__main__":
+    test_history_is_bounded_and_indexed_by_type()
+    test_wildcard_subscriptions_deliver_once_per_callback()
+    test_event_log_survives_restart_and_torn_tail()
+    test_transport_connects_buses_over_unix_socket()
+    test_strict_validation_rejects_the_whole_batch()
+    test_async_backpressure_policies_on_a_full_queue()
+    test_partitioned_subscriber_keeps_key_order_and_isolates_partitions()
+    test_failed_publish_leaves_bus_and_log_usable()
+    print("[OK] Sovereign bus tests passed")